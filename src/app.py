@@ -1,12 +1,13 @@
-import time
+import selectors
+import socket
+import threading
 
 from loguru import logger
 
 from src.config import config
 from src.core.audio_handler import AudioHandler
 from src.core.network_manager import NetworkManager
-from src.core.peer_discovery import PeerDiscovery
-import threading
+from src.core.peer_discovery import PeerDiscovery, PeerInfo
 
 
 class VoiceP2PChat:
@@ -25,13 +26,29 @@ class VoiceP2PChat:
 
         self.discovery = PeerDiscovery(username)
         self.network = NetworkManager()
-        self.audio = AudioHandler()
+        self.audio = AudioHandler(compression=config.AUDIO_COMPRESSION)
 
         self.waiting_music_stop = threading.Event()
         self.waiting_thread = None
 
+        # Защищает включение/выключение записи при подключении/отключении пиров
+        self.audio_lock = threading.Lock()
+
+        # Будит проверку неподключенных пиров (новый пир или остановка)
+        self.peer_check_wakeup = threading.Event()
+
+        # stop() вызывается и из start(), и из UI: остановка выполняется один раз
+        self.stop_lock = threading.Lock()
+        self.stopped = False
+
+        # Пробуждение главного цикла (selectors) при остановке чата
+        self.stop_wakeup_r, self.stop_wakeup_w = socket.socketpair()
+        self.stop_wakeup_r.setblocking(False)
+
         self.network.set_audio_callback(self._on_audio_received)
         self.network.set_text_callback(self._on_text_received)
+        self.network.set_connection_callback(self._on_connection_changed)
+        self.discovery.set_new_peer_callback(self._on_new_peer)
 
         logger.debug(f'VoiceP2PChat инициализирован для {username}')
 
@@ -44,15 +61,63 @@ class VoiceP2PChat:
         """
         self.text_message_callback = callback
 
-    def _on_audio_received(self, audio_data: bytes, peer_ip: str) -> None:
+    def _on_audio_received(self, audio_data: memoryview, peer_ip: str, compressed: bool) -> None:
         """
         Callback для обработки полученного аудио.
 
         Args:
-            audio_data: Байты аудио данных
+            audio_data: Аудио данные (memoryview на буфер приема)
             peer_ip: IP адрес отправителя
+            compressed: True для Vorbis/OGG, False для несжатого PCM
+        """
+        self.audio.play_audio(audio_data, peer_ip, compressed)
+
+    def _on_new_peer(self, peer_ip: str, peer_info: PeerInfo) -> None:
+        """
+        Callback для подключения к только что обнаруженному пиру.
+
+        Подключается _peer_check_loop: здесь его только будим, чтобы к пиру не было
+        двух одновременных попыток подключения и обнаружение не блокировалось.
+
+        Args:
+            peer_ip: IP адрес пира
+            peer_info: Информация о пире
+        """
+        self.peer_check_wakeup.set()
+
+    def _on_connection_changed(self, peer_ip: str, connected: bool) -> None:
         """
-        self.audio.play_audio(audio_data, peer_ip)
+        Callback изменения состояния соединения с пиром.
+
+        Микрофон и буфер захвата нужны только пока есть хотя бы один собеседник.
+
+        Args:
+            peer_ip: IP адрес пира
+            connected: True при подключении, False при отключении
+        """
+        with self.audio_lock:
+            if not self.running:
+                return
+
+            if self.network.get_connected_peers():
+                self._ensure_audio_started()
+            else:
+                self._ensure_audio_stopped()
+
+    def _ensure_audio_started(self) -> None:
+        """Начать запись, если она еще не идет (первый пир подключился)."""
+        if self.audio.recording:
+            return
+
+        try:
+            self.audio.start_recording()
+        except Exception as e:
+            logger.error(f'Не удалось начать запись с микрофона: {e}')
+
+    def _ensure_audio_stopped(self) -> None:
+        """Остановить запись, если она идет (последний пир отключился)."""
+        if self.audio.recording:
+            self.audio.stop_recording()
 
     def _on_text_received(self, message: str, peer_ip: str) -> None:
         """
@@ -67,8 +132,7 @@ class VoiceP2PChat:
             username, text = message.split(': ', 1)
         else:
             # Fallback если формат неправильный
-            peers = self.discovery.get_peers()
-            username = peers.get(peer_ip, {}).get('username', peer_ip)
+            username = self.discovery.username_for(peer_ip)
             text = message
 
         # НЕ логируем здесь - логи идут в UI через callback
@@ -99,8 +163,11 @@ class VoiceP2PChat:
         # Запустить сетевой менеджер
         self.network.start()
 
-        # Начать запись аудио
-        self.audio.start_recording()
+        # Запись с микрофона начнется при подключении первого пира (см. _on_connection_changed)
+
+        # Переподключение к обнаруженным, но не подключенным пирам
+        peer_check_thread = threading.Thread(target=self._peer_check_loop, daemon=True)
+        peer_check_thread.start()
 
         # self.waiting_thread = threading.Thread(
         #     target=self.audio.melody, args=(self.waiting_music_stop,), daemon=True
@@ -109,47 +176,96 @@ class VoiceP2PChat:
 
         logger.success(f'Чат запущен! Пользователь: {self.username}')
 
-        # Главный цикл
-        try:
-            last_connection_check = 0
+        # Главный цикл: ждем в selectors готовности микрофона или сигнала остановки, без опроса
+        # по таймеру. Подключение к новым пирам происходит через callback PeerDiscovery,
+        # прием данных от пиров - в потоках NetworkManager.
+        selector = selectors.DefaultSelector()
+        selector.register(self.audio, selectors.EVENT_READ)
+        selector.register(self.stop_wakeup_r, selectors.EVENT_READ)
 
+        try:
             while self.running:
-                current_time = time.time()
-
-                # Периодически проверяем новых пиров и подключаемся к ним
-                if current_time - last_connection_check > config.CONNECTION_CHECK_INTERVAL:
-                    self._connect_to_new_peers()
-                    last_connection_check = current_time
-
-                # Получить аудио и отправить всем
-                audio_chunk = self.audio.get_audio_chunk()
-                if audio_chunk:
-                    self.network.send_audio(audio_chunk)
-
-                time.sleep(config.AUDIO_SEND_INTERVAL)
+                for key, _ in selector.select():
+                    if key.fileobj is self.audio:
+                        self._send_captured_audio()
 
         except KeyboardInterrupt:
             logger.info('Получен сигнал остановки (Ctrl+C)')
         finally:
+            selector.close()
             self.stop()
+            self.stop_wakeup_r.close()
+            self.stop_wakeup_w.close()
+
+    def _send_captured_audio(self) -> None:
+        """Отправить пирам все целые чанки, накопленные в буфере захвата."""
+        audio = self.audio
+        audio.drain_wakeup()
+
+        for _ in range(audio.pending_chunks()):
+            audio_chunk = audio.get_audio_chunk()
+            if audio_chunk:
+                self.network.send_audio(audio_chunk, audio.compression)
+
+    def _peer_check_loop(self) -> None:
+        """
+        Периодически подключаться к обнаруженным, но не подключенным пирам.
 
-    def _connect_to_new_peers(self) -> None:
-        """Подключиться к новым обнаруженным пирам."""
-        discovered_peers = self.discovery.get_peers()
-        connected_peers = self.network.get_connected_peers()
+        Интервал адаптивный: начинается с CONNECTION_CHECK_INITIAL, удваивается после каждой
+        проверки без новых соединений (до CONNECTION_CHECK_MAX) и сбрасывается при появлении пира.
+        """
+        check_initial = config.CONNECTION_CHECK_INITIAL
+        check_max = config.CONNECTION_CHECK_MAX
+        interval = check_initial
+
+        while self.running:
+            # Сбрасываем до проверки: set() во время проверки не потеряется и разбудит wait ниже
+            woken = self.peer_check_wakeup.is_set()
+            self.peer_check_wakeup.clear()
+
+            if self._connect_to_new_peers() or woken:
+                # Новый пир в сети - снова проверяем соединения часто
+                interval = check_initial
+            else:
+                interval = min(interval * 2, check_max)
 
-        for peer_ip, peer_info in discovered_peers.items():
-            if peer_ip not in connected_peers:
-                logger.debug(f'Попытка подключения к {peer_info["username"]} ({peer_ip})')
-                self.network.connect_to_peer(peer_ip, peer_info['tcp_port'])
+            self.peer_check_wakeup.wait(interval)
+
+    def _connect_to_new_peers(self) -> bool:
+        """
+        Подключиться к новым обнаруженным пирам.
+
+        Returns:
+            True если установлено хотя бы одно новое соединение
+        """
+        connected_peers = set(self.network.get_connected_peers())
+        connected_new = False
+
+        for peer_ip, peer_info in self.discovery.iter_new_peers(connected_peers):
+            logger.debug(f'Попытка подключения к {peer_info.username} ({peer_ip})')
+            if self.network.connect_to_peer(peer_ip, peer_info.tcp_port):
+                connected_new = True
+
+        return connected_new
 
     def stop(self) -> None:
         """Остановить чат."""
+        with self.stop_lock:
+            if self.stopped:
+                return
+            self.stopped = True
+
         self.running = False
+        self.peer_check_wakeup.set()
+        try:
+            self.stop_wakeup_w.send(b'\x01')
+        except OSError:
+            pass
 
         logger.info('Остановка чата...')
 
-        self.audio.stop_recording()
+        with self.audio_lock:
+            self._ensure_audio_stopped()
         self.network.stop()
         self.discovery.stop()
 
@@ -169,6 +285,6 @@ class VoiceP2PChat:
             logger.info('Обнаруженные пиры:')
             for peer_ip, info in discovered.items():
                 status = 'подключен' if peer_ip in connected else 'не подключен'
-                logger.info(f'  - {info["username"]} ({peer_ip}) - {status}')
+                logger.info(f'  - {info.username} ({peer_ip}) - {status}')
         else:
             logger.info('Пиры не обнаружены')
@@ -1,8 +1,8 @@
 import curses
 import threading
-import time
 from collections import deque
 from curses import window
+from itertools import islice
 
 from loguru import logger
 
@@ -12,6 +12,12 @@ from src.config import config
 MODE_MENU = 0
 MODE_CHAT = 1
 
+# Сколько getch() ждет ввода, прежде чем вернуть -1 и дать перерисовать экран
+INPUT_TIMEOUT_MS = 30
+# В слишком маленьком окне рисовать нечего, поэтому ждем ресайза дольше
+SMALL_WINDOW_TIMEOUT_MS = 200
+MIN_WINDOW_H = 10
+
 
 cat_10 = [
     '   -*               ',
@@ -175,6 +181,49 @@ logo = [
     '░▒▓█▓▒░░▒▓█▓▒░░▒▓██████▓▒░░▒▓█▓▒░░▒▓█▓▒░▒▓█▓▒░░▒▓█▓▒░',
 ]
 
+# Арт хранится готовыми байтами: addstr не перекодирует каждую строку на каждом кадре.
+# Размеры считаются по str, так как в байтах UTF-8 символы логотипа занимают по 3 байта
+logo_h = len(logo)
+logo_w = len(logo[0])
+logo_rows = [row.encode('utf-8') for row in logo]
+
+signature = ['АВТОРЫ:', 'РОМАН СОКОЛОВСКИЙ', 'РУСЛАН КУТОРГИН']
+signature_rows = [row.encode('utf-8') for row in signature]
+signature_h = len(signature[1])
+
+
+class ChatMessages(deque):
+    """Лента сообщений с номером версии, который растет при каждом добавлении строки."""
+
+    def __init__(self, maxlen: int) -> None:
+        super().__init__(maxlen=maxlen)
+        self.seq = 0
+
+    def append(self, message: str) -> None:
+        super().append(message)
+        self.seq += 1
+
+
+# Одна лента на процесс: ее наполняют и UI, и синк логов
+chat_messages = ChatMessages(maxlen=300)
+log_sink_id: int | None = None
+
+
+def install_log_sink() -> None:
+    # Синк ставится один раз, повторный запуск UI не пересоздает обработчики loguru.
+    # Он вызывается прямо в потоке логирования: deque.append атомарен под GIL,
+    # поэтому фоновая очередь loguru (enqueue=True) здесь не нужна
+    global log_sink_id
+    if log_sink_id is not None:
+        return
+
+    logger.remove()
+    log_sink_id = logger.add(
+        chat_messages.append,
+        format=('<level>{message}</level>'),
+        level=config.LOG_LEVEL,
+    )
+
 
 def draw_chat_box(stdscr: window, y: int, x: int, h: int, w: int):
     stdscr.addstr(y, x, '+' + '-' * (w - 2) + '+')
@@ -188,16 +237,19 @@ def draw_messages(stdscr: window, messages, y: int, x: int, h: int, w: int):
     if limit <= 0:
         return
 
-    visible = list(messages)[-limit:]
+    # Берем только хвост ленты. tuple(islice(...)) проходит deque целиком в C коде,
+    # поэтому append из потока логов не может вклиниться в середину обхода
+    visible = tuple(islice(messages, max(0, len(messages) - limit), None))
 
     for i, msg in enumerate(visible):
-        stdscr.addstr(y + i, x + 1, msg[: (w - 1)])
+        stdscr.addnstr(y + i, x + 1, msg, w - 1)
         stdscr.addstr(y + i, x + w, '|')
 
 
 def draw_input(stdscr: window, chat_input: str, y: int, x: int, w: int):
     stdscr.addstr(y, x, ' ' * w)
-    stdscr.addstr(y, x, '> ' + chat_input[: w - 2])
+    stdscr.addstr(y, x, '> ')
+    stdscr.addnstr(y, x + 2, chat_input, w - 2)
 
 
 def draw_cat(stdscr: window, h: int, w: int, cat: list[str]) -> None:
@@ -210,53 +262,66 @@ def draw_cat(stdscr: window, h: int, w: int, cat: list[str]) -> None:
         stdscr.addstr(i, w - m - 1, cat[n - 1 - i][::-1])
 
 
-def draw_logo(stdscr: window, h: int, w: int, offset_h: int = 0, offset_w: int = 0) -> None:
-    n = len(logo)
-    m = len(logo[0])
-    start_h = h // 2 - n // 2 + offset_h
-    start_w = w // 2 - m // 2 + offset_w
-    if (start_h < 0) or ((start_h + n) > h) or (start_w < 0) or ((start_w + m) > w):
+def logo_origin(h: int, w: int, offset_h: int = 0, offset_w: int = 0) -> tuple[int, int] | None:
+    start_h = h // 2 - logo_h // 2 + offset_h
+    start_w = w // 2 - logo_w // 2 + offset_w
+    if (start_h < 0) or ((start_h + logo_h) > h) or (start_w < 0) or ((start_w + logo_w) > w):
+        return None
+    return start_h, start_w
+
+
+def draw_logo(stdscr: window, origin: tuple[int, int] | None) -> None:
+    if origin is None:
         return
 
-    for i in range(n):
-        stdscr.addstr(start_h + i, start_w, logo[i])
+    start_h, start_w = origin
+    for i, row in enumerate(logo_rows):
+        stdscr.addstr(start_h + i, start_w, row)
 
 
 def draw_signature(stdscr: window, h: int, w: int):
-    authors = 'АВТОРЫ:'
-    roma = 'РОМАН СОКОЛОВСКИЙ'
-    ruslan = 'РУСЛАН КУТОРГИН'
-
-    if len(roma) > h:
+    if signature_h > h:
         return
 
-    stdscr.addstr(0, 0, authors)
-    stdscr.addstr(1, 0, roma)
-    stdscr.addstr(2, 0, ruslan)
-    stdscr.addstr(h - 1, w - 3, 'v1')
+    for i, row in enumerate(signature_rows):
+        stdscr.addstr(i, 0, row)
+    stdscr.addstr(h - 1, w - 3, b'v1')
 
 
-def draw_button(
-    stdscr: window,
-    label: str,
+def button_origin(
     h: int,
     w: int,
-    focused=False,
     d: int = 12,
     offset_h: int = 0,
     offset_w: int = 0,
-):
-    attr = curses.A_REVERSE if focused else curses.A_NORMAL
+) -> tuple[int, int] | None:
     start_h = h // 2 - 1 + offset_h
     start_w = w // 2 - d // 2 + offset_w
     if (start_h < 0) or ((start_h + 1) > h) or (start_w < 0) or ((start_w + d) > w):
+        return None
+    return start_h, start_w
+
+
+def draw_button(
+    stdscr: window,
+    label: str,
+    origin: tuple[int, int] | None,
+    focused=False,
+    d: int = 12,
+):
+    if origin is None:
         return
+
+    attr = curses.A_REVERSE if focused else curses.A_NORMAL
+    start_h, start_w = origin
     stdscr.addstr(start_h, start_w, ' ' * d, attr)
     stdscr.addstr(start_h, start_w + (d - len(label)) // 2, label, attr)
 
 
 def input_text(stdscr: window, y: int, x: int, max_len: int = 20, prompt: str = '> '):
     curses.curs_set(1)
+    # Во время ввода анимации нет, поэтому getch может блокироваться до нажатия
+    stdscr.nodelay(False)
     buf = ''
 
     while True:
@@ -280,13 +345,15 @@ def input_text(stdscr: window, y: int, x: int, max_len: int = 20, prompt: str =
             buf += chr(key)
 
     curses.curs_set(0)
+    stdscr.timeout(INPUT_TIMEOUT_MS)
     return buf
 
 
 def app(stdscr: window):
     curses.curs_set(0)
-    stdscr.nodelay(False)
     stdscr.keypad(True)
+    # getch() ждет ввода в C коде (без GIL) и возвращает -1 по таймауту вместо time.sleep
+    stdscr.timeout(INPUT_TIMEOUT_MS)
 
     stdscr.clear()
     stdscr.refresh()
@@ -299,40 +366,82 @@ def app(stdscr: window):
 
     mode = MODE_MENU
     name = ''
-    messages = deque(maxlen=300)
-
-    logger.remove()
-    logger.add(
-        lambda m: messages.append(m),
-        format=('<level>{message}</level>'),
-        level=config.LOG_LEVEL,
-        enqueue=True,
-    )
+    messages = chat_messages
+    install_log_sink()
     chat_input = ''
     chat = None
 
+    # Экран перерисовывается только когда что-то изменилось: нажатие, ресайз, смена режима
+    # или новое сообщение в чате (номер версии ленты отличается от отрисованного)
+    dirty = True
+    drawn_seq = -1
+    # Размеры окна и координаты элементов меняются только при KEY_RESIZE
+    geom = None
+
     while True:
         if chat and not chat.running:
             break
 
-        stdscr.erase()
-        h, w = stdscr.getmaxyx()
-        if h < 10:
+        if geom is None:
+            h, w = stdscr.getmaxyx()
+            geom = (
+                h,
+                w,
+                logo_origin(h, w, -2),
+                [button_origin(h, w, offset_h=offset_h) for _, offset_h in buttons],
+            )
+        h, w, logo_pos, button_pos = geom
+        if h < MIN_WINDOW_H:
+            if dirty:
+                dirty = False
+                stdscr.erase()
+                stdscr.addnstr(0, 0, 'ОКНО СЛИШКОМ МАЛЕНЬКОЕ', w - 1)
+                stdscr.refresh()
+
+            # Геометрия закэширована, поэтому новый размер окна можно узнать только из KEY_RESIZE
+            stdscr.timeout(SMALL_WINDOW_TIMEOUT_MS)
+            key = stdscr.getch()
+            stdscr.timeout(INPUT_TIMEOUT_MS)
+            if key == curses.KEY_RESIZE:
+                geom = None
+                dirty = True
             continue
 
-        if mode == MODE_CHAT:
-            box_h = h - 6
-            box_w = w - 10
-            box_y = 2
-            box_x = 5
+        if dirty or (mode == MODE_CHAT and messages.seq != drawn_seq):
+            # Номер запоминается до отрисовки, чтобы не потерять сообщение, пришедшее во время нее
+            dirty = False
+            drawn_seq = messages.seq
+
+            stdscr.erase()
 
-            draw_chat_box(stdscr, box_y, box_x, box_h, box_w)
-            draw_messages(stdscr, messages, box_y + 1, box_x + 1, box_h - 2, box_w - 2)
-            draw_input(stdscr, chat_input, box_y + box_h - 2, box_x + 1, box_w - 2)
+            if mode == MODE_CHAT:
+                box_h = h - 6
+                box_w = w - 10
+                box_y = 2
+                box_x = 5
+
+                draw_chat_box(stdscr, box_y, box_x, box_h, box_w)
+                draw_messages(stdscr, messages, box_y + 1, box_x + 1, box_h - 2, box_w - 2)
+                draw_input(stdscr, chat_input, box_y + box_h - 2, box_x + 1, box_w - 2)
+            else:
+                draw_logo(stdscr, logo_pos)
+                # draw_signature(stdscr, h, w)
+                for i, (label, _) in enumerate(buttons):
+                    draw_button(stdscr, label, button_pos[i], focused=(i == current))
 
             stdscr.refresh()
-            key = stdscr.getch()
 
+        key = stdscr.getch()
+        if key == -1:
+            continue
+
+        # Любая клавиша (включая KEY_RESIZE) меняет то, что нужно показать
+        dirty = True
+        if key == curses.KEY_RESIZE:
+            geom = None
+            continue
+
+        if mode == MODE_CHAT:
             if key in (curses.KEY_ENTER, ord('\n')):
                 if chat_input.strip():
                     # Отправляем сообщение через чат
@@ -347,17 +456,8 @@ def app(stdscr: window):
                 mode = MODE_MENU
             elif 32 <= key <= 126:
                 chat_input += chr(key)
-            time.sleep(0.03)
             continue
 
-        draw_logo(stdscr, h, w, -2)
-        # draw_signature(stdscr, h, w)
-        for i, (label, offset_h) in enumerate(buttons):
-            draw_button(stdscr, label, h, w, focused=(i == current), offset_h=offset_h)
-
-        stdscr.refresh()
-        key = stdscr.getch()
-
         if key in (curses.KEY_DOWN, ord('\t')):
             current = (current + 1) % len(buttons)
         elif key in (curses.KEY_UP,):
@@ -388,9 +488,6 @@ def app(stdscr: window):
 
                     chat_thread.start()
 
-                    stdscr.nodelay(True)
-
                     mode = MODE_CHAT
             elif label == 'ВЫЙТИ':
                 break
-        time.sleep(0.03)
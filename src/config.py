@@ -1,32 +1,97 @@
 import os
+from dataclasses import dataclass, fields
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+@dataclass(frozen=True, slots=True)
 class Config:
     """Конфигурация приложения."""
 
     # User Configuration
-    USERNAME: str = str(os.getenv('USERNAME', ''))
+    USERNAME: str = ''
 
     # Network Configuration
-    TCP_HOST: str = str(os.getenv('TCP_HOST'))
-    TCP_PORT: int = int(os.getenv('TCP_PORT'))
-    BROADCAST_PORT: int = int(os.getenv('BROADCAST_PORT'))
+    TCP_HOST: str = '0.0.0.0'
+    TCP_PORT: int = 5001
+    BROADCAST_PORT: int = 5000
 
     # Discovery Configuration
-    BROADCAST_INTERVAL: int = int(os.getenv('BROADCAST_INTERVAL', '2'))
-    PEER_TIMEOUT: int = int(os.getenv('PEER_TIMEOUT', '10'))
-    CLEANUP_INTERVAL: int = int(os.getenv('CLEANUP_INTERVAL', '3'))
+    BROADCAST_INTERVAL: int = 2
+    PEER_TIMEOUT: int = 10
+    CLEANUP_INTERVAL: int = 3
+    UNICAST_SCAN_INTERVAL: int = 10
+    DISCOVERY_INTERVAL_MAX: float = 10.0
 
-    # Network Configuration
-    CONNECTION_CHECK_INTERVAL: int = int(os.getenv('CONNECTION_CHECK_INTERVAL', '3'))
-    AUDIO_SEND_INTERVAL: float = float(os.getenv('AUDIO_SEND_INTERVAL', '0.05'))
+    # Connection Configuration
+    CONNECTION_CHECK_INITIAL: float = 0.5
+    CONNECTION_CHECK_MAX: float = 30.0
+
+    # Audio Configuration
+    AUDIO_COMPRESSION: bool = True
 
     # Logging Configuration
-    LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_LEVEL: str = 'INFO'
+
+    def __post_init__(self) -> None:
+        """Проверить значения, которые нельзя обнаружить приведением типов."""
+        for name in ('TCP_PORT', 'BROADCAST_PORT'):
+            port = getattr(self, name)
+            if not 0 < port < 65536:
+                raise ValueError(f'Некорректная конфигурация: {name}={port} вне диапазона 1-65535')
+
+
+def _parse_bool(raw: str) -> bool:
+    """
+    Привести строку из окружения к bool.
+
+    Args:
+        raw: Значение переменной окружения
+
+    Returns:
+        Логическое значение
+
+    Raises:
+        ValueError: Если строка не похожа на логическое значение
+    """
+    value = raw.strip().lower()
+    if value in ('1', 'true', 'yes', 'on'):
+        return True
+    if value in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(raw)
+
+
+def _load() -> Config:
+    """
+    Прочитать конфигурацию из окружения (один раз при импорте).
+
+    Returns:
+        Неизменяемый объект конфигурации
+
+    Raises:
+        ValueError: Если значение переменной окружения нельзя привести к нужному типу
+    """
+    values = {}
+
+    for field in fields(Config):
+        raw = os.getenv(field.name)
+        if raw is None:
+            continue
+
+        # bool('false') == True, поэтому логические значения разбираются отдельно
+        parse = _parse_bool if field.type is bool else field.type
+
+        try:
+            values[field.name] = parse(raw)
+        except ValueError as e:
+            raise ValueError(
+                f'Некорректная конфигурация: {field.name}={raw!r} (ожидается {field.type.__name__})'
+            ) from e
+
+    return Config(**values)
 
 
-config = Config()
+config = _load()
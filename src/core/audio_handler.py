@@ -1,7 +1,10 @@
 import io
+import math
+import os
+import socket
 import threading
 import time
-from queue import Empty, Queue
+from collections import deque
 
 import numpy as np
 import pyaudio
@@ -9,13 +12,429 @@ import soundfile as sf
 from loguru import logger
 
 
+class SPSCRingBuffer:
+    """
+    Кольцевой байтовый буфер для одного писателя и одного читателя.
+
+    Память выделяется один раз. Позицию записи (tail) меняет только писатель,
+    позицию чтения (head) - только читатель, поэтому блокировки не нужны:
+    присваивание int атомарно под GIL, а индекс публикуется после копирования данных.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Инициализация буфера.
+
+        Args:
+            capacity: Размер буфера в байтах
+        """
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._head = 0  # Сколько байт прочитано за все время
+        self._tail = 0  # Сколько байт записано за все время
+
+    def __len__(self) -> int:
+        """Количество байт, доступных для чтения."""
+        return self._tail - self._head
+
+    def write(self, data: bytes | memoryview) -> bool:
+        """
+        Записать данные в хвост буфера (только писатель).
+
+        Args:
+            data: Данные для записи
+
+        Returns:
+            False если места недостаточно и данные отброшены
+        """
+        size = len(data)
+        if size > self.capacity - (self._tail - self._head):
+            return False
+
+        start = self._tail % self.capacity
+        first = min(size, self.capacity - start)
+        source = memoryview(data)
+
+        self._view[start : start + first] = source[:first]
+        if first < size:
+            self._view[: size - first] = source[first:]
+
+        # Публикуем запись только после копирования данных
+        self._tail += size
+        return True
+
+    def peek(self, size: int) -> memoryview | bytes | None:
+        """
+        Получить size байт из головы буфера без сдвига позиции чтения (только читатель).
+
+        Данные остаются валидными до вызова advance().
+
+        Args:
+            size: Количество байт
+
+        Returns:
+            memoryview на данные (bytes при переходе через границу буфера) или None
+        """
+        if self._tail - self._head < size:
+            return None
+
+        start = self._head % self.capacity
+        end = start + size
+        if end <= self.capacity:
+            return self._view[start:end]
+
+        # Редкий случай: данные разрезаны границей буфера
+        return bytes(self._view[start:]) + bytes(self._view[: end - self.capacity])
+
+    def advance(self, size: int) -> None:
+        """
+        Освободить size прочитанных байт (только читатель).
+
+        Args:
+            size: Количество байт
+        """
+        self._head += size
+
+
+class SPSCRing:
+    """
+    Кольцевая очередь объектов фиксированной емкости для одного писателя и одного читателя.
+
+    Работает как SPSCRingBuffer, но хранит ссылки в заранее выделенном списке слотов:
+    put() меняет только tail, get() - только head, блокировки и Condition не нужны.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Инициализация очереди.
+
+        Args:
+            capacity: Максимальное количество элементов
+        """
+        self.capacity = capacity
+        self._slots: list = [None] * capacity
+        self._head = 0  # Сколько элементов прочитано за все время
+        self._tail = 0  # Сколько элементов записано за все время
+
+    def __len__(self) -> int:
+        """Количество элементов, доступных для чтения."""
+        return self._tail - self._head
+
+    def put(self, item) -> bool:
+        """
+        Добавить элемент в хвост очереди (только писатель).
+
+        Args:
+            item: Элемент
+
+        Returns:
+            False если очередь заполнена и элемент не добавлен
+        """
+        tail = self._tail
+        if tail - self._head >= self.capacity:
+            return False
+
+        self._slots[tail % self.capacity] = item
+        # Публикуем элемент только после записи в слот
+        self._tail = tail + 1
+        return True
+
+    def peek(self):
+        """
+        Посмотреть элемент в голове очереди, не забирая его (только читатель).
+
+        Returns:
+            Элемент или None, если очередь пуста
+        """
+        head = self._head
+        if head == self._tail:
+            return None
+        return self._slots[head % self.capacity]
+
+    def get(self):
+        """
+        Забрать элемент из головы очереди (только читатель).
+
+        Returns:
+            Элемент или None, если очередь пуста
+        """
+        head = self._head
+        if head == self._tail:
+            return None
+
+        index = head % self.capacity
+        item = self._slots[index]
+        self._slots[index] = None
+        self._head = head + 1
+        return item
+
+    def drop(self, count: int) -> list:
+        """
+        Выбросить до count самых старых элементов одним сдвигом головы (только читатель).
+
+        Args:
+            count: Сколько элементов выбросить
+
+        Returns:
+            Выброшенные элементы (чтобы вызывающий мог освободить связанные с ними ресурсы)
+        """
+        head = self._head
+        count = min(count, self._tail - head)
+        capacity = self.capacity
+        slots = self._slots
+
+        dropped = []
+        for position in range(head, head + count):
+            index = position % capacity
+            dropped.append(slots[index])
+            slots[index] = None
+
+        self._head = head + count
+        return dropped
+
+
+class JitterEstimator:
+    """
+    Оценка джиттера прихода пакетов одного пира и нужной глубины его буфера.
+
+    Джиттер - сглаженное отклонение интервала между пакетами от длительности чанка (как в RFC 3550).
+    Обновляется только потоком приема пира, поток воспроизведения лишь читает target.
+    """
+
+    SMOOTHING = 1 / 16  # Коэффициент EWMA
+    SPURT_GAP = 4  # Интервал длиннее стольких чанков - пауза между фразами (шумовой гейт), а не джиттер
+
+    def __init__(self, interval: float, min_target: int, max_target: int) -> None:
+        """
+        Инициализация оценки.
+
+        Args:
+            interval: Ожидаемый интервал между пакетами (длительность чанка) в секундах
+            min_target: Минимальная глубина буфера в пакетах
+            max_target: Максимальная глубина буфера в пакетах
+        """
+        self.interval = interval
+        self.min_target = min_target
+        self.max_target = max_target
+        self.jitter = 0.0
+        self.last_arrival: float | None = None
+        self.target = min_target  # Сколько пакетов копить перед началом воспроизведения
+
+    def update(self, now: float) -> None:
+        """
+        Учесть приход очередного пакета.
+
+        Args:
+            now: Время прихода (time.monotonic)
+        """
+        last = self.last_arrival
+        self.last_arrival = now
+        if last is None:
+            return
+
+        delta = now - last
+        if delta > self.interval * self.SPURT_GAP:
+            return
+
+        self.jitter += (abs(delta - self.interval) - self.jitter) * self.SMOOTHING
+
+        # Буфер должен покрывать удвоенный джиттер
+        target = math.ceil(2 * self.jitter / self.interval)
+        self.target = max(self.min_target, min(self.max_target, target))
+
+
+class PacketReader:
+    """
+    Файлоподобное чтение пакета из memoryview для soundfile.
+
+    soundfile читает через readinto() прямо в буфер libsndfile, поэтому пакет
+    не копируется в BytesIO. Один объект переиспользуется для всех пакетов (reset).
+    """
+
+    def __init__(self) -> None:
+        """Инициализация пустого читателя."""
+        self.view = memoryview(b'')
+        self.pos = 0
+
+    def reset(self, data: bytes | memoryview) -> None:
+        """
+        Начать чтение нового пакета.
+
+        Args:
+            data: Данные пакета (должны оставаться валидными до конца чтения)
+        """
+        self.view = memoryview(data)
+        self.pos = 0
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Переместить позицию чтения (как io.IOBase.seek)."""
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.pos = max(0, min(offset, len(self.view)))
+        return self.pos
+
+    def tell(self) -> int:
+        """Текущая позиция чтения."""
+        return self.pos
+
+    def readinto(self, buffer) -> int:
+        """
+        Скопировать следующие байты пакета в buffer.
+
+        Args:
+            buffer: Буфер назначения (поддерживающий запись срезом)
+
+        Returns:
+            Количество скопированных байт
+        """
+        start = self.pos
+        count = min(len(buffer), len(self.view) - start)
+        buffer[:count] = self.view[start : start + count]
+        self.pos = start + count
+        return count
+
+
+class NoiseGate:
+    """
+    Шумовой гейт: чанки, которые не громче шумового фона, не кодируются и не отправляются.
+
+    Фон отслеживается по минимуму: сразу опускается до энергии тихого чанка
+    и медленно (NOISE_FLOOR_RISE за чанк) растет, если тишины давно не было.
+    """
+
+    GATE_RATIO = 4.0  # Во сколько раз энергия речи должна превышать фон
+    NOISE_FLOOR_MIN = 1e-7  # Нижняя граница фона (средний квадрат семпла, ~-70 dBFS)
+    NOISE_FLOOR_INITIAL = 1e-5  # Начальный фон (~-50 dBFS)
+    NOISE_FLOOR_RISE = 1.05  # Во сколько раз фон может вырасти за один чанк
+    HANGOVER_CHUNKS = 2  # Сколько чанков еще отправлять после речи, чтобы не обрезать слова
+
+    def __init__(self) -> None:
+        """Инициализация гейта."""
+        self.noise_floor = self.NOISE_FLOOR_INITIAL
+        self.hangover = 0
+
+    def is_silence(self, signal: np.ndarray) -> bool:
+        """
+        Проверить, что чанк не громче шумового фона.
+
+        Args:
+            signal: Нормализованные семплы float32
+
+        Returns:
+            True если чанк можно не отправлять
+        """
+        energy = float(np.dot(signal, signal)) / len(signal)
+        self.noise_floor = max(min(energy, self.noise_floor * self.NOISE_FLOOR_RISE), self.NOISE_FLOOR_MIN)
+
+        if energy > self.noise_floor * self.GATE_RATIO:
+            self.hangover = self.HANGOVER_CHUNKS
+            return False
+
+        if self.hangover:
+            self.hangover -= 1
+            return False
+
+        return True
+
+
+class PacketMixer:
+    """
+    Декодирование Vorbis пакетов (или чтение несжатого PCM) и их суммирование в int16 PCM.
+
+    Буферы выделяются заранее: пакет декодируется в decode_i16, сумма потоков
+    копится в int32 (без переполнения), результат ограничивается до int16.
+    Пакет длиннее буферов (например, нота мелодии) не обрезается: буферы увеличиваются.
+    """
+
+    def __init__(self, samples: int) -> None:
+        """
+        Инициализация микшера.
+
+        Args:
+            samples: Ожидаемое количество семплов в пакете (размер чанка)
+        """
+        self.decode_i16 = np.empty(samples, dtype=np.int16)
+        self.mix_i32 = np.empty(samples, dtype=np.int32)
+        self.mix_i16 = np.empty(samples, dtype=np.int16)
+        self.reader = PacketReader()
+
+    def _reserve(self, samples: int) -> None:
+        """
+        Увеличить буферы под пакет из samples семплов (уже просуммированная часть сохраняется).
+
+        Args:
+            samples: Количество семплов в пакете
+        """
+        if samples <= len(self.decode_i16):
+            return
+
+        mix = np.empty(samples, dtype=np.int32)
+        mix[: len(self.mix_i32)] = self.mix_i32
+        self.mix_i32 = mix
+        self.decode_i16 = np.empty(samples, dtype=np.int16)
+        self.mix_i16 = np.empty(samples, dtype=np.int16)
+
+    def mix(self, packets: list[tuple[bytes | memoryview, bool]]) -> np.ndarray | None:
+        """
+        Декодировать и просуммировать пакеты по самой короткой длине.
+
+        Args:
+            packets: Пары (данные пакета, сжат ли он Vorbis/OGG); несжатые - int16 PCM
+
+        Returns:
+            Срез внутреннего int16 буфера (валиден до следующего вызова) или None, если декодировать нечего
+        """
+        reader = self.reader
+        mixed = 0  # Длина уже просуммированной части
+
+        for data, compressed in packets:
+            if not compressed:
+                # Несжатый PCM суммируется прямо из слота пакета, без декодирования
+                count = len(data) // 2
+                self._reserve(count)
+                pcm = np.frombuffer(data, dtype=np.int16, count=count)
+            else:
+                try:
+                    # Декодируем Vorbis сразу в int16 в заранее выделенный буфер, весь пакет:
+                    # libsndfile знает число семплов по последней странице OGG
+                    reader.reset(data)
+                    with sf.SoundFile(reader) as packet:
+                        frames = packet.frames
+                        self._reserve(frames)
+                        pcm = packet.read(frames, dtype='int16', out=self.decode_i16[:frames])
+                except Exception as e:
+                    logger.warning(f'Ошибка декодирования пакета: {e}')
+                    continue
+
+            # Суммируем потоки (ключевая фича!)
+            mix = self.mix_i32
+            n = len(pcm)
+            if not mixed:
+                mix[:n] = pcm
+                mixed = n
+            else:
+                mixed = min(mixed, n)
+                mix[:mixed] += pcm[:mixed]
+
+        if not mixed:
+            return None
+
+        # Сумма int32 → int16 с ограничением, чтобы громкие потоки не переполнялись
+        out = self.mix_i16[:mixed]
+        np.clip(self.mix_i32[:mixed], -32768, 32767, out=out, casting='unsafe')
+        return out
+
+
 class AudioHandler:
     """
     Простой аудио обработчик с Vorbis сжатием.
 
     Архитектура:
     - Микрофон → numpy array → Vorbis (OGG) → Network
-    - Network → Vorbis decode → numpy array → суммирование → PyAudio
+    - Network → Vorbis decode → numpy array → суммирование → кольцевой буфер → PyAudio callback
     """
 
     # Аудио параметры (из статьи Habr)
@@ -24,15 +443,70 @@ class AudioHandler:
     CHANNELS = 1  # Mono для голоса
     RATE = 16000  # 16 kHz (достаточно для речи, меньше трафика)
 
-    PLAYBACK_QUEUE_SIZE = 50  # Размер очереди воспроизведения
+    SAMPLE_WIDTH = 2  # Байт на семпл (int16)
+    PCM_SCALE = np.float32(1 / 32768)  # int16 → float32 [-1.0, 1.0]
+
+    PEER_QUEUE_SIZE = 16  # Размер очереди воспроизведения одного пира (~2 секунды)
+    PACKET_SLOT_COUNT = 100  # Общее количество слотов под пакеты всех пиров
+    OUTPUT_TARGET_CHUNKS = 2  # Сколько чанков держать смикшированными впереди callback динамиков
+    JITTER_BUFFER_MIN = 2  # Минимум пакетов пира перед началом (и после опустения) его очереди
+    JITTER_BUFFER_MAX = 8  # Максимум, до которого буфер растет при большом джиттере сети (~1 секунда)
+    PLAYBACK_THREAD_PRIORITY = 10  # Приоритет SCHED_FIFO для потока воспроизведения (Linux, если разрешено)
+    PEER_MAX_LAG = 4  # Если у пира накопилось на столько пакетов больше буфера, старые выбрасываются
+    PACKET_SLOT_SIZE = 16 * 1024  # Максимальный размер пакета в очереди (OGG обычно ~4 KB, PCM чанк 4 KB)
+    CAPTURE_BUFFER_CHUNKS = 16  # Вместимость буфера захвата в чанках (~2 секунды)
+    PLAYBACK_BUFFER_CHUNKS = 8  # Вместимость буфера PCM для динамиков в чанках (~1 секунда)
+
+    def __init__(self, compression: bool = True) -> None:
+        """
+        Инициализация аудио обработчика.
 
-    def __init__(self) -> None:
-        """Инициализация аудио обработчика."""
+        Args:
+            compression: Сжимать захваченный звук в Vorbis (False - отдавать несжатый PCM)
+        """
         self.recording: bool = False
         self.running: bool = True
-
-        # Очередь для воспроизведения
-        self.playback_queue: Queue = Queue(maxsize=self.PLAYBACK_QUEUE_SIZE)
+        self.compression = compression
+
+        # Пакеты копируются в заранее выделенные слоты, а через очереди передаются только
+        # (номер слота, длина, время прихода, сжат ли пакет). У каждого пира своя SPSC очередь:
+        # писатель в нее один - поток приема этого пира, читатель - поток воспроизведения.
+        # Общий пул свободных слотов - deque (append/popleft атомарны).
+        # Event будит поток воспроизведения при появлении пакетов и места в буфере динамиков
+        self.packet_slots = [
+            memoryview(bytearray(self.PACKET_SLOT_SIZE)) for _ in range(self.PACKET_SLOT_COUNT)
+        ]
+        self.free_slots: deque[int] = deque(range(self.PACKET_SLOT_COUNT))
+        self.peer_queues: dict[str | None, SPSCRing] = {}
+        self.peer_jitter: dict[str | None, JitterEstimator] = {}
+        self.playback_ready = threading.Event()
+        self.playback_dropped = 0  # Сколько пакетов отброшено из-за переполнения очередей
+
+        # Буфер RAW PCM, который наполняет callback PortAudio.
+        # Выделяется только на время записи (см. start_recording)
+        self.chunk_bytes = self.CHUNK * self.CHANNELS * self.SAMPLE_WIDTH
+        self.capture_buffer: SPSCRingBuffer | None = None
+
+        # Переиспользуемый float32 буфер для нормализации чанка перед кодированием
+        self.capture_f32 = np.empty(self.CHUNK * self.CHANNELS, dtype=np.float32)
+
+        # Обработка звука вынесена в компоненты, которые сами владеют своими буферами
+        self.noise_gate = NoiseGate()
+        self.mixer = PacketMixer(self.CHUNK * self.CHANNELS)
+
+        # Смикшированный PCM, который забирает callback выходного потока PortAudio
+        self.playback_buffer = SPSCRingBuffer(self.chunk_bytes * self.PLAYBACK_BUFFER_CHUNKS)
+        # Неизменяемый чанк тишины: пока никто не говорит, callback отдает его без выделения памяти
+        self.output_silence = bytes(self.chunk_bytes)
+
+        # Закодированные ноты тестовой мелодии: {(частота, длительность, громкость): OGG bytes}
+        self.melody_cache: dict[tuple[float, float, float], bytes] = {}
+
+        # Callback PortAudio пишет в пару сокетов по байту на каждый чанк, поэтому
+        # готовность микрофона можно ждать в selectors вместе с другими событиями (см. fileno)
+        self.capture_wakeup_r, self.capture_wakeup_w = socket.socketpair()
+        self.capture_wakeup_r.setblocking(False)
+        self.capture_wakeup_w.setblocking(False)
 
         # PyAudio
         self.pa = None
@@ -42,22 +516,15 @@ class AudioHandler:
         try:
             self.pa = pyaudio.PyAudio()
 
-            # Входной поток (микрофон)
-            self.input_stream = self.pa.open(
-                format=self.FORMAT,
-                channels=self.CHANNELS,
-                rate=self.RATE,
-                input=True,
-                frames_per_buffer=self.CHUNK,
-            )
-
-            # Выходной поток (динамики)
+            # Выходной поток (динамики) в callback режиме: PortAudio сам забирает PCM из
+            # playback_buffer в своем потоке, поток воспроизведения не блокируется на write
             self.output_stream = self.pa.open(
                 format=self.FORMAT,
                 channels=self.CHANNELS,
                 rate=self.RATE,
                 output=True,
                 frames_per_buffer=self.CHUNK,
+                stream_callback=self._on_output_audio,
             )
 
             logger.success(
@@ -76,41 +543,179 @@ class AudioHandler:
         self.playback_thread.start()
 
     def start_recording(self) -> None:
-        """Начать запись с микрофона."""
+        """
+        Начать запись с микрофона.
+
+        Буфер захвата и входной поток создаются лениво, только когда запись действительно нужна.
+        """
+        if self.recording:
+            return
+
+        self.capture_buffer = SPSCRingBuffer(self.chunk_bytes * self.CAPTURE_BUFFER_CHUNKS)
+
+        # Входной поток (микрофон) в callback режиме: PortAudio сам отдает готовые чанки
+        self.input_stream = self.pa.open(
+            format=self.FORMAT,
+            channels=self.CHANNELS,
+            rate=self.RATE,
+            input=True,
+            frames_per_buffer=self.CHUNK,
+            stream_callback=self._on_input_audio,
+        )
+
         self.recording = True
         logger.info('Запись с микрофона начата')
 
     def stop_recording(self) -> None:
-        """Остановить запись."""
+        """Остановить запись и освободить входной поток и буфер захвата."""
+        if not self.recording:
+            return
+
         self.recording = False
+        self._close_input_stream()
+        self.capture_buffer = None
+
+        # Будим отправителя, ожидающего данные
+        self._notify_capture()
+
         logger.info('Запись остановлена')
 
+    def _on_input_audio(self, in_data: bytes, frame_count: int, time_info: dict, status: int) -> tuple:
+        """
+        Callback PortAudio для входного потока (вызывается в потоке PortAudio).
+
+        Args:
+            in_data: RAW PCM данные с микрофона
+            frame_count: Количество фреймов в чанке
+            time_info: Временные метки PortAudio
+            status: Флаги состояния потока
+
+        Returns:
+            Кортеж (данные для вывода, флаг продолжения)
+        """
+        # Если отправитель не успевает и буфер полон - теряем самый свежий чанк, не блокируя PortAudio
+        buffer = self.capture_buffer
+        if self.recording and buffer is not None and buffer.write(in_data):
+            self._notify_capture()
+
+        return None, pyaudio.paContinue
+
+    def _on_output_audio(self, in_data: None, frame_count: int, time_info: dict, status: int) -> tuple:
+        """
+        Callback PortAudio для выходного потока (вызывается в потоке PortAudio).
+
+        Args:
+            in_data: Не используется (поток только на вывод)
+            frame_count: Количество фреймов, которое нужно отдать
+            time_info: Временные метки PortAudio
+            status: Флаги состояния потока
+
+        Returns:
+            Кортеж (PCM для динамиков, флаг продолжения)
+        """
+        size = frame_count * self.CHANNELS * self.SAMPLE_WIDTH
+        buffer = self.playback_buffer
+        available = min(len(buffer), size)
+
+        silence = self.output_silence
+        if not available:
+            return (silence if len(silence) == size else bytes(size)), pyaudio.paContinue
+
+        # PyAudio принимает только неизменяемые bytes, поэтому одна копия из кольца неизбежна
+        if available == size:
+            data = bytes(buffer.peek(size))
+        else:
+            # Данных не хватает - дополняем тишиной, чтобы PortAudio не останавливал поток
+            padding = size - available
+            tail = silence[:padding] if padding <= len(silence) else bytes(padding)
+            data = bytes(buffer.peek(available)) + tail
+
+        buffer.advance(available)
+
+        # Место освободилось - поток воспроизведения может смикшировать следующий чанк
+        self.playback_ready.set()
+        return data, pyaudio.paContinue
+
+    def _notify_capture(self) -> None:
+        """Сообщить ожидающему в selectors потоку, что в буфере захвата появились данные."""
+        try:
+            self.capture_wakeup_w.send(b'\x01')
+        except (BlockingIOError, OSError):
+            # Сокет переполнен (читатель и так разбужен) или уже закрыт при завершении
+            pass
+
+    def fileno(self) -> int:
+        """
+        Дескриптор, который становится читаемым, когда появляются данные с микрофона.
+
+        Позволяет регистрировать AudioHandler в selectors.DefaultSelector.
+
+        Returns:
+            Номер файлового дескриптора
+        """
+        return self.capture_wakeup_r.fileno()
+
+    def drain_wakeup(self) -> None:
+        """Вычитать накопившиеся сигналы готовности, чтобы selectors не срабатывал повторно."""
+        try:
+            while self.capture_wakeup_r.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def pending_chunks(self) -> int:
+        """
+        Количество целых чанков, уже накопленных в буфере захвата.
+
+        Returns:
+            Число чанков, которые можно забрать через get_audio_chunk без ожидания
+        """
+        buffer = self.capture_buffer
+        if buffer is None:
+            return 0
+        return len(buffer) // self.chunk_bytes
+
     def get_audio_chunk(self) -> bytes | None:
         """
-        Получить сжатый аудио chunk (Vorbis/OGG).
+        Получить сжатый аудио chunk (Vorbis/OGG) или несжатый PCM, если сжатие выключено.
+
+        Не блокируется: готовность данных нужно ждать по fileno() в selectors.
 
         Процесс:
-        1. Читаем RAW PCM с микрофона
-        2. Конвертируем в numpy array (int16 → float32)
-        3. Сжимаем через soundfile (Vorbis codec)
-        4. Возвращаем сжатые OGG bytes
+        1. Берем RAW PCM чанк из буфера callback микрофона
+        2. Конвертируем в numpy array (int16 → float32, без временных массивов)
+        3. Пропускаем тишину (шумовой гейт по энергии)
+        4. Сжимаем через soundfile (Vorbis codec), если compression включен
+        5. Возвращаем сжатые OGG bytes (или RAW PCM)
 
         Returns:
-            Сжатые OGG данные или None при ошибке/тишине
+            Аудио данные или None при ошибке/тишине/отсутствии полного чанка
         """
-        if not self.recording or not self.input_stream:
+        buffer = self.capture_buffer
+        chunk_bytes = self.chunk_bytes
+
+        if buffer is None or len(buffer) < chunk_bytes:
             return None
 
-        try:
-            # Читаем RAW PCM с микрофона
-            raw_pcm = self.input_stream.read(self.CHUNK, exception_on_overflow=False)
+        raw_pcm = buffer.peek(chunk_bytes)
+        if raw_pcm is None:
+            return None
+
+        # int16 → float32 в диапазоне [-1.0, 1.0] за один проход в заранее выделенный буфер.
+        # Данные скопированы, поэтому место в кольцевом буфере можно сразу освободить
+        signal = self.capture_f32
+        np.multiply(np.frombuffer(raw_pcm, dtype=np.int16), self.PCM_SCALE, out=signal)
+        pcm_data = None if self.compression else bytes(raw_pcm)
+        buffer.advance(chunk_bytes)
 
-            # Конвертируем в numpy array (int16 → float32 для soundfile)
-            signal = np.frombuffer(raw_pcm, dtype=np.int16).astype(np.float32)
+        # Тишину не кодируем: энергия считается гораздо дешевле сжатия Vorbis
+        if self.noise_gate.is_silence(signal):
+            return None
 
-            # Нормализуем в диапазон [-1.0, 1.0]
-            signal = signal / 32768.0
+        if pcm_data is not None:
+            return pcm_data
 
+        try:
             # Сжимаем через Vorbis (soundfile)
             # Используем BytesIO чтобы не писать на диск
             byte_io = io.BytesIO()
@@ -126,9 +731,9 @@ class AudioHandler:
                 self._compression_counter = 1
 
             if self._compression_counter % 100 == 0:
-                compression_ratio = len(raw_pcm) / len(ogg_data)
+                compression_ratio = chunk_bytes / len(ogg_data)
                 logger.debug(
-                    f'Vorbis compression: {len(raw_pcm)}→{len(ogg_data)} bytes ({compression_ratio:.1f}x)'
+                    f'Vorbis compression: {chunk_bytes}→{len(ogg_data)} bytes ({compression_ratio:.1f}x)'
                 )
 
             return ogg_data
@@ -137,110 +742,182 @@ class AudioHandler:
             logger.error(f'Ошибка при кодировании аудио: {e}')
             return None
 
-    def play_audio(self, ogg_data: bytes, peer_ip: str | None = None) -> None:
+    def play_audio(
+        self, ogg_data: bytes | memoryview, peer_ip: str | None = None, compressed: bool = True
+    ) -> None:
         """
-        Воспроизвести полученные OGG данные.
+        Воспроизвести полученные OGG данные (или несжатый PCM).
+
+        Для одного peer_ip метод должен вызываться из одного потока (поток приема этого пира).
 
         Args:
-            ogg_data: Сжатые Vorbis/OGG данные
-            peer_ip: IP адрес отправителя (для логирования)
+            ogg_data: Сжатые Vorbis/OGG данные (memoryview валиден только во время вызова)
+            peer_ip: IP адрес отправителя (ключ очереди пира)
+            compressed: False если ogg_data - несжатый int16 PCM
         """
         if not ogg_data:
             return
 
+        size = len(ogg_data)
+        if size > self.PACKET_SLOT_SIZE:
+            logger.warning(f'Слишком большой аудио пакет ({size} байт) от {peer_ip}')
+            return
+
+        now = time.monotonic()
+        queue = self.peer_queues.get(peer_ip)
+        if queue is None:
+            # Оценку джиттера создаем раньше очереди: поток воспроизведения ищет ее по найденной очереди
+            self.peer_jitter[peer_ip] = JitterEstimator(
+                self.CHUNK / self.RATE, self.JITTER_BUFFER_MIN, self.JITTER_BUFFER_MAX
+            )
+            queue = self.peer_queues[peer_ip] = SPSCRing(self.PEER_QUEUE_SIZE)
+
+        self.peer_jitter[peer_ip].update(now)
+
+        if len(queue) >= self.PEER_QUEUE_SIZE:
+            # Голова очереди принадлежит потоку воспроизведения, поэтому теряем новый пакет
+            self._count_dropped(1, f'очередь воспроизведения переполнена, пакет от {peer_ip}')
+            return
+
         try:
-            # Добавляем в очередь воспроизведения
-            self.playback_queue.put_nowait(ogg_data)
+            slot = self.free_slots.popleft()
+        except IndexError:
+            logger.warning(f'Нет свободных слотов воспроизведения, пропущен пакет от {peer_ip}')
+            return
 
-            # Логируем размер очереди
-            queue_size = self.playback_queue.qsize()
-            if queue_size % 20 == 0:
-                logger.debug(f'Очередь: {queue_size}/{self.PLAYBACK_QUEUE_SIZE}')
+        # Единственная копия пакета: буфер приема сети будет переиспользован
+        self.packet_slots[slot][:size] = ogg_data
 
-        except:
-            # Очередь полна - удаляем старые пакеты
-            try:
-                for _ in range(5):
-                    self.playback_queue.get_nowait()
-                self.playback_queue.put_nowait(ogg_data)
-                logger.warning('Очередь переполнена, удалено 5 старых пакетов')
-            except:
-                logger.warning(f'Пропущен пакет от {peer_ip}')
+        # Добавляем в очередь пира (место проверено выше, писатель у очереди один)
+        queue.put((slot, size, now, compressed))
+        self.playback_ready.set()
+
+    def _count_dropped(self, count: int, reason: str) -> None:
+        """
+        Учесть потерянные пакеты воспроизведения (лог раз в 50 потерь).
+
+        Args:
+            count: Сколько пакетов потеряно
+            reason: Причина для лога
+        """
+        before = self.playback_dropped
+        self.playback_dropped = before + count
+        if before // 50 != self.playback_dropped // 50 or before == 0:
+            logger.warning(f'Потеряны пакеты воспроизведения ({reason}), всего: {self.playback_dropped}')
+
+    def _raise_thread_priority(self) -> None:
+        """
+        Попробовать перевести текущий поток в realtime планирование (SCHED_FIFO).
+
+        Нужны права (CAP_SYS_NICE или rtprio в limits.conf); без них поток остается с обычным приоритетом.
+        """
+        if not hasattr(os, 'sched_setscheduler'):
+            return
+
+        try:
+            # На Linux pid 0 означает текущий поток, а не весь процесс
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.PLAYBACK_THREAD_PRIORITY))
+            logger.info(f'Поток воспроизведения получил realtime приоритет {self.PLAYBACK_THREAD_PRIORITY}')
+        except OSError as e:
+            logger.debug(f'Realtime приоритет недоступен, обычный приоритет: {e}')
 
     def _playback_loop(self) -> None:
         """
         Поток воспроизведения с суммированием аудиопотоков.
 
         Алгоритм (из статьи Habr):
-        1. Собираем все доступные пакеты из очереди (non-blocking)
-        2. Декодируем каждый из Vorbis → numpy array
-        3. СУММИРУЕМ все arrays (это позволяет слышать всех одновременно!)
-        4. Конвертируем обратно в PCM и воспроизводим
+        1. Пока в буфере динамиков меньше OUTPUT_TARGET_CHUNKS чанков, берем по одному пакету от каждого пира
+        2. Декодируем каждый из Vorbis → int16 numpy array
+        3. СУММИРУЕМ все arrays в int32 (это позволяет слышать всех одновременно!)
+        4. Ограничиваем до int16 PCM и кладем в буфер callback выходного потока
+
+        Последовательные пакеты одного пира не складываются друг с другом, а играют по очереди.
+        Очередь пира начинает играть, когда в ней накопилось столько пакетов, сколько требует
+        измеренный джиттер этого пира (от JITTER_BUFFER_MIN до JITTER_BUFFER_MAX), или когда самый
+        старый пакет ждет столько же времени, и снова накапливается, когда опустела.
+        Поток спит на Event: его будят play_audio, callback выходного потока и _cleanup.
         """
         logger.info('Поток воспроизведения запущен (суммирование потоков)')
+        self._raise_thread_priority()
+
+        # Все, что нужно на каждой итерации, достаем из self один раз
+        peer_queues = self.peer_queues
+        ready = self.playback_ready
+        slots = self.packet_slots
+        free_slots = self.free_slots
+        mixer = self.mixer
+        playback_buffer = self.playback_buffer
+        output_target = self.chunk_bytes * self.OUTPUT_TARGET_CHUNKS
+        peer_jitter = self.peer_jitter
+        max_lag = self.PEER_MAX_LAG
+        chunk_duration = self.CHUNK / self.RATE
+        monotonic = time.monotonic
+
+        primed: set[SPSCRing] = set()  # Очереди пиров, которые уже играют (состояние только этого потока)
 
         while self.running:
             try:
-                # ========== Собираем все доступные пакеты ==========
+                # ========== Берем по пакету от каждого пира ==========
                 packets = []
+                prefilling = False  # Есть очереди, которые еще копят пакеты
+
+                if len(playback_buffer) < output_target:
+                    # Снимок значений: play_audio может добавить очередь нового пира
+                    for peer_ip, queue in list(peer_queues.items()):
+                        target = peer_jitter[peer_ip].target
+
+                        if queue not in primed:
+                            head = queue.peek()
+                            if head is None:
+                                continue
+                            if len(queue) < target and monotonic() - head[2] < (target - 1) * chunk_duration:
+                                prefilling = True
+                                continue
+                            primed.add(queue)
+                        elif len(queue) > target + max_lag:
+                            # Пир отстал (всплеск после задержки сети) - догоняем, оставляя target пакетов
+                            dropped = queue.drop(len(queue) - target)
+                            free_slots.extend(entry[0] for entry in dropped)
+                            self._count_dropped(len(dropped), 'очередь пира отстала')
+
+                        packet = queue.get()
+                        if packet is None:
+                            # Очередь опустела - пир снова будет копить пакеты
+                            primed.discard(queue)
+                        else:
+                            packets.append(packet)
 
-                # Читаем все что есть в очереди (non-blocking)
-                while True:
-                    try:
-                        ogg_data = self.playback_queue.get_nowait()
-                        packets.append(ogg_data)
-                    except Empty:
-                        # Очередь пуста - выходим из цикла
-                        break
-
-                # Если нет пакетов - ждем
+                # Нечего микшировать или динамики еще не забрали прошлые чанки - ждем сигнала
+                # от play_audio или callback выходного потока
                 if not packets:
-                    time.sleep(0.01)
+                    ready.clear()
+                    # Повторная проверка после clear(), чтобы не потерять сигнал.
+                    # Без очередей в накоплении таймаут не нужен: _cleanup будит поток при остановке
+                    if prefilling:
+                        ready.wait(chunk_duration)
+                    elif len(playback_buffer) >= output_target or not any(peer_queues.values()):
+                        ready.wait()
                     continue
 
                 # ========== Декодируем и суммируем ==========
-                summed_audio = None
-
-                for ogg_data in packets:
-                    try:
-                        # Декодируем Vorbis → numpy array
-                        byte_io = io.BytesIO(ogg_data)
-                        audio_float, _ = sf.read(byte_io)
+                out = mixer.mix([(slots[slot][:size], compressed) for slot, size, _, compressed in packets])
 
-                        # Суммируем потоки (ключевая фича!)
-                        if summed_audio is None:
-                            summed_audio = audio_float.copy()
-                        else:
-                            # Убеждаемся что размеры совпадают
-                            min_len = min(len(summed_audio), len(audio_float))
-                            summed_audio = summed_audio[:min_len] + audio_float[:min_len]
+                # Пакеты декодированы - слоты можно отдать под новые
+                free_slots.extend(entry[0] for entry in packets)
 
-                    except Exception as e:
-                        logger.warning(f'Ошибка декодирования пакета: {e}')
-                        continue
-
-                if summed_audio is None:
+                if out is None:
                     continue
 
-                # ========== Конвертируем и воспроизводим ==========
-                try:
-                    # float32 [-1.0, 1.0] → int16 [-32768, 32767]
-                    audio_int16 = (summed_audio * 32768.0).astype(np.int16)
-
-                    # Воспроизводим
-                    self.output_stream.write(audio_int16.tobytes())
-
-                    # Логируем количество суммированных потоков
-                    if len(packets) > 1:
-                        logger.debug(f'Суммировано {len(packets)} аудиопотоков')
-
-                except OSError as e:
-                    logger.warning(f'OSError при воспроизведении: {e}')
-                    continue
-                except Exception as e:
-                    logger.error(f'Ошибка при воспроизведении: {e}')
+                # ========== Воспроизводим ==========
+                # Отдаем в буфер callback выходного потока (без промежуточных bytes)
+                if not playback_buffer.write(out.view(np.uint8)):
+                    logger.warning('Буфер воспроизведения переполнен, чанк пропущен')
                     continue
 
+                # Логируем количество суммированных потоков
+                if len(packets) > 1:
+                    logger.debug('Суммировано {} аудиопотоков', len(packets))
+
             except Exception as e:
                 logger.error(f'Ошибка в playback loop: {e}')
                 time.sleep(0.1)
@@ -254,9 +931,6 @@ class AudioHandler:
         Args:
             stop_event: Event для остановки воспроизведения
         """
-        import array
-        import math
-
         # Нотная последовательность (частота, длительность)
         notes = [
             (261.63, 0.2),  # C4
@@ -271,6 +945,13 @@ class AudioHandler:
 
         volume = 0.0  # Отключена по умолчанию (0.0-1.0)
 
+        if volume == 0:
+            # Тишину незачем синтезировать, кодировать и микшировать: callback динамиков и так
+            # отдает тишину, когда воспроизводить нечего
+            logger.info('Мелодия отключена (громкость 0)')
+            stop_event.wait()
+            return
+
         logger.info('Мелодия запущена (для тестирования)')
 
         while not stop_event.is_set():
@@ -278,38 +959,9 @@ class AudioHandler:
                 if stop_event.is_set():
                     break
 
-                # Генерация синусоидального сигнала
-                frames = array.array('h')  # signed short (int16)
-                samples_count = int(self.RATE * duration)
-
-                for i in range(samples_count):
-                    # Плавное нарастание/затухание (envelope)
-                    t = i / samples_count
-                    if t < 0.1:
-                        envelope = t / 0.1
-                    elif t > 0.9:
-                        envelope = 1 - (t - 0.9) / 0.1
-                    else:
-                        envelope = 1.0
-                    envelope = max(0.0, min(1.0, envelope))
-
-                    # Генерация семпла
-                    sample = int(32767 * volume * envelope * math.sin(2 * math.pi * freq * i / self.RATE))
-                    frames.append(sample)
-
-                # Конвертируем в bytes
-                raw_pcm = frames.tobytes()
-
-                # Кодируем в Vorbis и воспроизводим
                 try:
-                    # Конвертируем в numpy для soundfile
-                    signal = np.frombuffer(raw_pcm, dtype=np.int16).astype(np.float32)
-                    signal = signal / 32768.0
-
-                    # Сжимаем в Vorbis
-                    byte_io = io.BytesIO()
-                    sf.write(byte_io, signal, self.RATE, format='OGG')
-                    ogg_data = bytes(byte_io.getbuffer())
+                    # Ноты повторяются каждый круг, поэтому кодируются только один раз
+                    ogg_data = self._encoded_note(freq, duration, volume)
 
                     # Воспроизводим через обычный механизм
                     self.play_audio(ogg_data, peer_ip='melody')
@@ -320,26 +972,82 @@ class AudioHandler:
 
         logger.info('Мелодия остановлена')
 
+    def _encoded_note(self, freq: float, duration: float, volume: float) -> bytes:
+        """
+        Получить ноту, сжатую в Vorbis (OGG), из кэша или закодировать ее.
+
+        Args:
+            freq: Частота ноты в Гц
+            duration: Длительность в секундах
+            volume: Громкость (0.0-1.0)
+
+        Returns:
+            Сжатые OGG данные
+        """
+        key = (freq, duration, volume)
+        ogg_data = self.melody_cache.get(key)
+        if ogg_data is None:
+            byte_io = io.BytesIO()
+            signal = self._synthesize_note(freq, duration, volume)
+            sf.write(byte_io, signal, self.RATE, format='OGG')
+            ogg_data = self.melody_cache[key] = bytes(byte_io.getbuffer())
+        return ogg_data
+
+    def _synthesize_note(self, freq: float, duration: float, volume: float) -> np.ndarray:
+        """
+        Сгенерировать ноту с плавным нарастанием и затуханием (векторно, без цикла по семплам).
+
+        Args:
+            freq: Частота ноты в Гц
+            duration: Длительность в секундах
+            volume: Громкость (0.0-1.0)
+
+        Returns:
+            Семплы float32 в диапазоне [-1.0, 1.0]
+        """
+        samples_count = int(self.RATE * duration)
+        n = np.arange(samples_count, dtype=np.float32)
+
+        # Envelope: линейно 0→1 за первые 10% ноты и 1→0 за последние 10%
+        t = n / samples_count
+        envelope = np.clip(np.minimum(t / 0.1, (1 - t) / 0.1), 0.0, 1.0)
+
+        signal = np.sin(n * np.float32(2 * np.pi * freq / self.RATE))
+        signal *= envelope
+        signal *= np.float32(volume)
+        return signal
+
+    def _close_input_stream(self) -> None:
+        """Безопасно закрыть входной поток (микрофон)."""
+        if self.input_stream:
+            try:
+                if self.input_stream.is_active():
+                    self.input_stream.stop_stream()
+                self.input_stream.close()
+            except Exception as e:
+                logger.warning(f'Ошибка закрытия input stream: {e}')
+            finally:
+                self.input_stream = None
+
     def _cleanup(self) -> None:
         """Безопасная очистка ресурсов."""
         logger.info('Cleanup AudioHandler...')
 
         # Останавливаем поток воспроизведения
         self.running = False
+        self.playback_ready.set()
 
         if hasattr(self, 'playback_thread') and self.playback_thread.is_alive():
             self.playback_thread.join(timeout=1.0)
 
         # Закрываем PyAudio потоки
-        if self.input_stream:
+        self._close_input_stream()
+
+        for sock in (self.capture_wakeup_r, self.capture_wakeup_w):
             try:
-                if self.input_stream.is_active():
-                    self.input_stream.stop_stream()
-                self.input_stream.close()
+                sock.close()
             except Exception as e:
-                logger.warning(f'Ошибка закрытия input stream: {e}')
-            finally:
-                self.input_stream = None
+                logger.warning(f'Ошибка закрытия сокета пробуждения: {e}')
 
         if self.output_stream:
             try:
@@ -3,6 +3,7 @@ import contextlib
 import socket
 import struct
 import threading
+from collections import deque
 from collections.abc import Callable
 
 from loguru import logger
@@ -10,12 +11,118 @@ from loguru import logger
 from src.config import config
 
 
+class PeerSender:
+    """
+    Буферизованная отправка пакетов одному пиру в отдельном потоке.
+
+    Медленный пир не блокирует отправителя: аудио копится в ограниченной очереди,
+    а при переполнении теряются самые старые пакеты (для голоса важнее свежие данные).
+    Текстовые сообщения идут через отдельную очередь и не теряются.
+    """
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        peer_ip: str,
+        on_error: Callable[['PeerSender', Exception], None],
+        capacity: int = 24,
+    ) -> None:
+        """
+        Создать отправителя и запустить его поток записи.
+
+        Args:
+            sock: Socket соединения с пиром
+            peer_ip: IP адрес пира
+            on_error: Функция, вызываемая из потока записи при ошибке отправки
+            capacity: Максимальное количество аудио пакетов в очереди
+        """
+        self.sock = sock
+        self.peer_ip = peer_ip
+        self.on_error = on_error
+        self.queue: deque[bytes | bytearray] = deque(maxlen=capacity)
+        # Текст не отбрасывается: у него своя очередь без ограничения (сообщения редкие и маленькие)
+        self.text_queue: deque[bytes | bytearray] = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+        # (ip, порт) стороны, открывшей соединение: по нему выбирается одно из встречных соединений
+        self.initiator: tuple[bytes, int] | None = None
+
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+
+    def push(self, packet: bytes | bytearray, droppable: bool = True) -> None:
+        """
+        Поставить пакет в очередь отправки, не блокируясь на сети.
+
+        Args:
+            packet: Готовый пакет (заголовок + данные)
+            droppable: False для пакетов, которые нельзя терять при переполнении (текст)
+        """
+        with self.cond:
+            if self.closed:
+                return
+
+            if droppable:
+                if len(self.queue) == self.queue.maxlen:
+                    # deque с maxlen сам вытеснит самый старый пакет
+                    self.dropped += 1
+                    if self.dropped % 50 == 1:
+                        logger.warning(
+                            f'Очередь отправки к {self.peer_ip} переполнена, потеряно пакетов: {self.dropped}'
+                        )
+                self.queue.append(packet)
+            else:
+                self.text_queue.append(packet)
+            self.cond.notify()
+
+    def close(self) -> None:
+        """Остановить поток записи и закрыть сокет."""
+        with self.cond:
+            self.closed = True
+            self.queue.clear()
+            self.text_queue.clear()
+            self.cond.notify()
+
+        with contextlib.suppress(Exception):
+            self.sock.close()
+
+    def _writer_loop(self) -> None:
+        """Отправлять пакеты из очереди, пока отправитель не закрыт."""
+        queue = self.queue
+        text_queue = self.text_queue
+        cond = self.cond
+
+        while True:
+            with cond:
+                while not queue and not text_queue and not self.closed:
+                    cond.wait()
+                if self.closed:
+                    return
+                # Текст отправляется первым: он не ждет накопившееся аудио
+                packet = text_queue.popleft() if text_queue else queue.popleft()
+
+            # sendall вне блокировки: push не ждет, пока пакет уйдет в сеть
+            try:
+                self.sock.sendall(packet)
+            except Exception as e:
+                if not self.closed:
+                    self.on_error(self, e)
+                return
+
+
 class NetworkManager:
     """Управление TCP соединениями для передачи аудио и текстовых сообщений."""
 
     # Типы пакетов
-    PACKET_TYPE_AUDIO = 0x01
+    PACKET_TYPE_AUDIO = 0x01  # Vorbis/OGG
     PACKET_TYPE_TEXT = 0x02
+    PACKET_TYPE_AUDIO_PCM = 0x03  # Несжатый int16 PCM
+
+    HEADER = struct.Struct('!BI')  # 1 байт тип + 4 байта размер
+    RECV_BUFFER_SIZE = 16 * 1024  # Начальный размер буфера приема на соединение
+    SEND_QUEUE_SIZE = 24  # Аудио пакетов в очереди отправки на пира (~3 секунды чанков по 128 мс)
+    MAX_PACKET_SIZE = 1024 * 1024  # Пакеты больше считаются ошибкой протокола
 
     def __init__(self, tcp_port: int | None = None) -> None:
         """
@@ -25,20 +132,26 @@ class NetworkManager:
             tcp_port: Порт для TCP соединений
         """
         self.tcp_port = tcp_port or config.TCP_PORT
-        self.connections = {}  # {peer_ip: socket}
+        self.connections = {}  # {peer_ip: PeerSender}
+        # Неизменяемый снимок отправителей для _send_packet: пересобирается под self.lock при каждом
+        # изменении connections, а читается без блокировки (замена ссылки атомарна)
+        self.senders: tuple[PeerSender, ...] = ()
         self.running = False
         self.audio_callback = None  # Функция для обработки полученного аудио
         self.text_callback = None  # Функция для обработки текстовых сообщений
+        self.connection_callback = None  # Функция, вызываемая при подключении/отключении пира
         self.lock = threading.Lock()
 
         logger.debug(f'NetworkManager инициализирован на порту {tcp_port}')
 
-    def set_audio_callback(self, callback: Callable[[bytes, str], None]) -> None:
+    def set_audio_callback(self, callback: Callable[[memoryview, str, bool], None]) -> None:
         """
         Установить callback для обработки полученного аудио.
 
+        Данные передаются как memoryview на буфер приема и валидны только во время вызова.
+
         Args:
-            callback: Функция, принимающая (data, peer_ip)
+            callback: Функция, принимающая (data, peer_ip, compressed)
         """
         self.audio_callback = callback
 
@@ -51,6 +164,31 @@ class NetworkManager:
         """
         self.text_callback = callback
 
+    def set_connection_callback(self, callback: Callable[[str, bool], None]) -> None:
+        """
+        Установить callback для отслеживания подключений и отключений пиров.
+
+        Вызывается вне блокировки, поэтому из него можно обращаться к NetworkManager.
+
+        Args:
+            callback: Функция, принимающая (peer_ip, connected)
+        """
+        self.connection_callback = callback
+
+    def _notify_connection(self, peer_ip: str, connected: bool) -> None:
+        """
+        Сообщить подписчику об изменении состояния соединения.
+
+        Args:
+            peer_ip: IP адрес пира
+            connected: True при подключении, False при отключении
+        """
+        if self.connection_callback:
+            try:
+                self.connection_callback(peer_ip, connected)
+            except Exception as e:
+                logger.error(f'Ошибка в обработчике соединения с {peer_ip}: {e}')
+
     def start(self) -> None:
         """Запустить сервер для приема соединений."""
         self.running = True
@@ -65,12 +203,12 @@ class NetworkManager:
         self.running = False
 
         with self.lock:
-            for peer_ip, conn in self.connections.items():
-                with contextlib.suppress(Exception):
-                    conn.close()
-                    logger.debug(f'Закрыто соединение с {peer_ip}')
+            for peer_ip, sender in self.connections.items():
+                sender.close()
+                logger.debug(f'Закрыто соединение с {peer_ip}')
 
             self.connections.clear()
+            self._publish_senders()
 
         logger.info('NetworkManager остановлен')
 
@@ -89,20 +227,9 @@ class NetworkManager:
                 conn, addr = server_socket.accept()
                 peer_ip = addr[0]
 
-                with self.lock:
-                    if peer_ip not in self.connections:
-                        self.connections[peer_ip] = conn
-                        logger.success(f'Входящее соединение от {peer_ip}')
-
-                        receive_thread = threading.Thread(
-                            target=self._receive_from_peer,
-                            args=(conn, peer_ip),
-                            daemon=True,
-                        )
-                        receive_thread.start()
-                    else:
-                        conn.close()
-                        logger.debug(f'Соединение от {peer_ip} уже существует')
+                if self._register_connection(conn, peer_ip, outgoing=False):
+                    logger.success(f'Входящее соединение от {peer_ip}')
+                    self._notify_connection(peer_ip, True)
 
             except TimeoutError:
                 continue
@@ -130,20 +257,15 @@ class NetworkManager:
             sock.settimeout(5.0)
             sock.connect((peer_ip, peer_port))
 
-            with self.lock:
-                self.connections[peer_ip] = sock
+            if not self._register_connection(sock, peer_ip, outgoing=True):
+                # Пир успел подключиться к нам сам, и осталось его соединение
+                return True
 
             # self.waiting_music_stop.set()
 
             logger.success(f'Подключено к {peer_ip}:{peer_port}')
 
-            # Запустить поток для приема данных
-            receive_thread = threading.Thread(
-                target=self._receive_from_peer,
-                args=(sock, peer_ip),
-                daemon=True,
-            )
-            receive_thread.start()
+            self._notify_connection(peer_ip, True)
 
             return True
 
@@ -151,6 +273,100 @@ class NetworkManager:
             logger.error(f'Не удалось подключиться к {peer_ip}:{peer_port}: {e}')
             return False
 
+    def _register_connection(self, sock: socket.socket, peer_ip: str, outgoing: bool) -> bool:
+        """
+        Зарегистрировать соединение с пиром и запустить прием из него.
+
+        Если пиры подключились друг к другу одновременно, у каждого окажется по два сокета.
+        Обе стороны должны оставить одно и то же соединение, иначе каждая закроет то, которое
+        оставила другая, и оборвутся оба. Поэтому остается соединение, открытое стороной
+        с меньшим (ip, порт): эту пару одинаково видят оба конца соединения.
+
+        Args:
+            sock: Socket соединения
+            peer_ip: IP адрес пира
+            outgoing: True если соединение открыли мы (connect_to_peer)
+
+        Returns:
+            True если соединение зарегистрировано, False если оставлено существующее
+        """
+        ip, port = (sock.getsockname() if outgoing else sock.getpeername())[:2]
+        initiator = (socket.inet_aton(ip), port)
+
+        with self.lock:
+            current = self.connections.get(peer_ip)
+            if current is not None and current.initiator is not None and current.initiator <= initiator:
+                sock.close()
+                logger.debug(f'Соединение с {peer_ip} уже существует')
+                return False
+
+            sender = self._create_sender(sock, peer_ip)
+            sender.initiator = initiator
+            self.connections[peer_ip] = sender
+            self._publish_senders()
+
+            # Поток приема запускается после регистрации: он проверяет, что его сокет текущий
+            threading.Thread(target=self._receive_from_peer, args=(sock, peer_ip), daemon=True).start()
+
+        if current is not None:
+            # Встречное соединение проиграло: его поток приема завершится, не удаляя новое
+            logger.debug(f'Встречное соединение с {peer_ip} заменено')
+            current.close()
+
+        return True
+
+    def _create_sender(self, sock: socket.socket, peer_ip: str) -> PeerSender:
+        """
+        Создать буферизованного отправителя для нового соединения.
+
+        Args:
+            sock: Socket соединения
+            peer_ip: IP адрес пира
+
+        Returns:
+            Отправитель с запущенным потоком записи
+        """
+        # connect_to_peer выставляет таймаут на время подключения, а поток записи должен блокироваться
+        sock.settimeout(None)
+
+        # Аудио пакеты маленькие и идут по одному: алгоритм Нейгла задерживал бы их до ACK.
+        # Буфер отправки ядра не увеличиваем - иначе в нем копилось бы устаревшее аудио,
+        # которое PeerSender умеет отбрасывать у себя в очереди. Буфер приема тоже не трогаем:
+        # SO_RCVBUF после установки соединения отключает его автоподстройку, а для голоса ее хватает
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            logger.warning(f'Не удалось настроить сокет {peer_ip}: {e}')
+
+        return PeerSender(sock, peer_ip, self._on_send_error, self.SEND_QUEUE_SIZE)
+
+    def _publish_senders(self) -> None:
+        """Пересобрать снимок отправителей (вызывать под self.lock после изменения connections)."""
+        self.senders = tuple(self.connections.values())
+
+    def _on_send_error(self, sender: PeerSender, error: Exception) -> None:
+        """
+        Обработать ошибку записи в сокет пира (вызывается из потока PeerSender).
+
+        Args:
+            sender: Отправитель, у которого произошла ошибка
+            error: Исключение sendall
+        """
+        peer_ip = sender.peer_ip
+        logger.error(f'Ошибка отправки к {peer_ip}: {error}')
+
+        with self.lock:
+            removed = self.connections.get(peer_ip) is sender
+            if removed:
+                del self.connections[peer_ip]
+                self._publish_senders()
+                logger.warning(f'Удалено разорванное соединение с {peer_ip}')
+
+        sender.close()
+
+        if removed:
+            self._notify_connection(peer_ip, False)
+
     def _receive_from_peer(self, conn: socket.socket, peer_ip: str) -> None:
         """
         Принимать данные (аудио и текст) от пира.
@@ -161,35 +377,49 @@ class NetworkManager:
         """
         logger.debug(f'Начат прием данных от {peer_ip}')
 
+        # Буферы заголовка и приема переиспользуются для всех пакетов соединения
+        header = self.HEADER
+        header_buffer = bytearray(header.size)
+        header_view = memoryview(header_buffer)
+        rx_buffer = bytearray(self.RECV_BUFFER_SIZE)
+        rx_view = memoryview(rx_buffer)
+        connections = self.connections
+
         while self.running:
             try:
-                # Читаем тип пакета (1 байт)
-                type_data = self._recv_exact(conn, 1)
-                if not type_data:
+                # Читаем заголовок целиком: тип пакета (1 байт) и размер данных (4 байта)
+                if not self._recv_into_exact(conn, header_view):
                     break
 
-                packet_type = struct.unpack('!B', type_data)[0]
+                packet_type, size = header.unpack_from(header_buffer)
 
-                # Читаем размер данных (4 байта)
-                size_data = self._recv_exact(conn, 4)
-                if not size_data:
+                if size > self.MAX_PACKET_SIZE:
+                    logger.error(f'Слишком большой пакет ({size} байт) от {peer_ip}')
                     break
 
-                size = struct.unpack('!I', size_data)[0]
+                if size > len(rx_buffer):
+                    rx_buffer = bytearray(size)
+                    rx_view = memoryview(rx_buffer)
+
+                # Читаем сами данные прямо в буфер приема
+                data = rx_view[:size]
+                if not self._recv_into_exact(conn, data):
+                    break
 
-                # Читаем сами данные
-                data = self._recv_exact(conn, size)
-                if not data:
+                # После переподключения очередью пира владеет поток нового соединения: старый
+                # поток больше ничего не отдает, иначе у SPSC очереди пира будет два писателя
+                sender = connections.get(peer_ip)
+                if sender is None or sender.sock is not conn:
                     break
 
                 # Обрабатываем в зависимости от типа
-                if packet_type == self.PACKET_TYPE_AUDIO:
+                if packet_type == self.PACKET_TYPE_AUDIO or packet_type == self.PACKET_TYPE_AUDIO_PCM:
                     if self.audio_callback:
-                        self.audio_callback(data, peer_ip)
+                        self.audio_callback(data, peer_ip, packet_type == self.PACKET_TYPE_AUDIO)
                 elif packet_type == self.PACKET_TYPE_TEXT:
                     if self.text_callback:
                         try:
-                            message = data.decode('utf-8')
+                            message = str(data, 'utf-8')
                             self.text_callback(message, peer_ip)
                         except UnicodeDecodeError as e:
                             logger.error(f'Ошибка декодирования текста от {peer_ip}: {e}')
@@ -201,44 +431,57 @@ class NetworkManager:
                 break
 
         with self.lock:
-            if peer_ip in self.connections:
+            # Удаляем только свое соединение: за это время мог появиться новый сокет с тем же пиром
+            sender = self.connections.get(peer_ip)
+            removed = sender is not None and sender.sock is conn
+            if removed:
                 del self.connections[peer_ip]
+                self._publish_senders()
+
+        if removed:
+            sender.close()
 
         with contextlib.suppress(builtins.BaseException):
             conn.close()
 
         logger.warning(f'Соединение с {peer_ip} закрыто')
 
-    def _recv_exact(self, conn: socket.socket, n: int) -> bytes | None:
+        if removed:
+            self._notify_connection(peer_ip, False)
+
+    def _recv_into_exact(self, conn: socket.socket, view: memoryview) -> bool:
         """
-        Получить ровно n байт из сокета.
+        Заполнить view данными из сокета целиком, без промежуточных bytes.
 
         Args:
             conn: Socket соединения
-            n: Количество байт для чтения
+            view: Область буфера для записи
 
         Returns:
-            Данные или None при ошибке
+            False если соединение закрыто
         """
-        data = b''
-        while len(data) < n:
-            chunk = conn.recv(n - len(data))
-            if not chunk:
-                return None
-            data += chunk
-        return data
-
-    def send_audio(self, audio_data: bytes) -> None:
+        received = 0
+        size = len(view)
+        while received < size:
+            count = conn.recv_into(view[received:])
+            if not count:
+                return False
+            received += count
+        return True
+
+    def send_audio(self, audio_data: bytes | memoryview, compressed: bool = True) -> None:
         """
         Отправить аудио всем подключенным пирам.
 
         Args:
             audio_data: Байты аудио данных
+            compressed: True для Vorbis/OGG, False для несжатого PCM
         """
         if not audio_data:
             return
 
-        self._send_packet(self.PACKET_TYPE_AUDIO, audio_data)
+        packet_type = self.PACKET_TYPE_AUDIO if compressed else self.PACKET_TYPE_AUDIO_PCM
+        self._send_packet(packet_type, audio_data)
 
     def send_text(self, message: str) -> None:
         """
@@ -257,34 +500,29 @@ class NetworkManager:
         except Exception as e:
             logger.error(f'Ошибка кодирования сообщения: {e}')
 
-    def _send_packet(self, packet_type: int, data: bytes) -> None:
+    def _send_packet(self, packet_type: int, data: bytes | memoryview) -> None:
         """
         Отправить пакет всем подключенным пирам.
 
         Args:
-            packet_type: Тип пакета (AUDIO или TEXT)
+            packet_type: Тип пакета (AUDIO, AUDIO_PCM или TEXT)
             data: Данные для отправки
         """
         if not data:
             return
 
-        size = len(data)
-        # Формат: 1 байт тип + 4 байта размер + данные
-        packet = struct.pack('!B', packet_type) + struct.pack('!I', size) + data
-
-        with self.lock:
-            disconnected = []
-
-            for peer_ip, conn in self.connections.items():
-                try:
-                    conn.sendall(packet)
-                except Exception as e:
-                    logger.error(f'Ошибка отправки к {peer_ip}: {e}')
-                    disconnected.append(peer_ip)
-
-            for peer_ip in disconnected:
-                del self.connections[peer_ip]
-                logger.warning(f'Удалено разорванное соединение с {peer_ip}')
+        # Формат: 1 байт тип + 4 байта размер + данные.
+        # Один буфер на всех пиров: заголовок пишется на место, данные копируются один раз
+        header = self.HEADER
+        packet = bytearray(header.size + len(data))
+        header.pack_into(packet, 0, packet_type, len(data))
+        packet[header.size :] = data
+
+        # Запись в сокеты идет в потоках PeerSender, поэтому медленный пир не тормозит остальных.
+        # Снимок читается без блокировки: закрытый отправитель просто проигнорирует пакет
+        droppable = packet_type != self.PACKET_TYPE_TEXT
+        for sender in self.senders:
+            sender.push(packet, droppable)
 
     def get_connected_peers(self) -> list[str]:
         """Получить список подключенных пиров."""
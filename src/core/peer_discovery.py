@@ -1,23 +1,140 @@
+import http.client
 import json
+import os
 import socket
+import struct
 import subprocess
 import threading
 import time
-import netifaces
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
 
+import netifaces
 from loguru import logger
 
 from src.config import config
 
 
+@dataclass(slots=True)
+class PeerInfo:
+    """Запись об обнаруженном пире."""
+
+    username: str
+    tcp_port: int
+    last_seen: float  # time.monotonic() последнего анонса
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP соединение поверх UNIX сокета (в том числе при переподключении внутри http.client)."""
+
+    def __init__(self, socket_path: str, timeout: float) -> None:
+        """
+        Инициализация соединения (сокет открывается в connect()).
+
+        Args:
+            socket_path: Путь к UNIX сокету
+            timeout: Таймаут операций с сокетом в секундах
+        """
+        # tailscaled проверяет Host: local-tailscaled.sock
+        super().__init__('local-tailscaled.sock', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        """Открыть UNIX сокет вместо TCP соединения с хостом."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class TailscaleLocalAPI:
+    """
+    Клиент локального HTTP API tailscaled через UNIX сокет.
+
+    Соединение переиспользуется между запросами, поэтому опрос пиров не порождает
+    процесс tailscale CLI и не переподключается каждый раз.
+    """
+
+    # Linux (пакеты tailscale) и macOS (tailscaled из Homebrew / open source сборка)
+    SOCKET_PATHS = ('/var/run/tailscale/tailscaled.sock', '/var/run/tailscaled.socket')
+
+    def __init__(self, socket_path: str | None = None, timeout: float = 3.0) -> None:
+        """
+        Инициализация клиента (подключение происходит при первом запросе).
+
+        Args:
+            socket_path: Путь к сокету tailscaled (по умолчанию первый существующий из SOCKET_PATHS)
+            timeout: Таймаут запроса в секундах
+        """
+        if socket_path is None:
+            existing = (path for path in self.SOCKET_PATHS if os.path.exists(path))
+            socket_path = next(existing, self.SOCKET_PATHS[0])
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.conn: UnixHTTPConnection | None = None
+
+    def available(self) -> bool:
+        """Есть ли сокет tailscaled на этой машине."""
+        return os.path.exists(self.socket_path)
+
+    def status(self) -> dict:
+        """
+        Получить статус сети (тот же JSON, что и `tailscale status --json`).
+
+        Returns:
+            Разобранный JSON статуса
+
+        Raises:
+            OSError, http.client.HTTPException, ValueError: При ошибке запроса или ответа
+        """
+        if self.conn is None:
+            # Сокет открывается при первом запросе и заново, если tailscaled его закрыл
+            self.conn = UnixHTTPConnection(self.socket_path, self.timeout)
+
+        try:
+            self.conn.request('GET', '/localapi/v0/status', headers={'Sec-Tailscale': 'localapi'})
+            response = self.conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            # Соединение сломано - в следующий раз подключимся заново
+            self.close()
+            raise
+
+        if response.status != 200:
+            raise ValueError(f'HTTP {response.status}: {body[:200]!r}')
+
+        return json.loads(body)
+
+    def close(self) -> None:
+        """Закрыть соединение."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
 class PeerDiscovery:
     """Обнаружение пиров в локальной сети через UDP broadcast."""
 
+    # Диапазон адресов Tailscale: CGNAT 100.64.0.0/10
+    TAILSCALE_NET = 0x64400000
+    TAILSCALE_MASK = 0xFFC00000
+
+    # Фильтр входящих анонсов до разбора JSON
+    ANNOUNCE_MAX_SIZE = 512  # Анонс - короткий JSON объект, больше быть не может
+    ANNOUNCE_MIN_GAP = 0.1  # Секунды между принятыми анонсами от одного адреса
+    ANNOUNCE_SOURCES_MAX = 1024  # Сколько адресов помнить до сброса таблицы
+
     def __init__(
         self,
         username: str,
         broadcast_port: int | None = None,
         tcp_port: int | None = None,
+        use_tailscale: bool = True,
     ) -> None:
         """
         Инициализация модуля обнаружения пиров.
@@ -26,18 +143,66 @@ class PeerDiscovery:
             username: Имя пользователя
             broadcast_port: Порт для UDP broadcast
             tcp_port: Порт для TCP соединений
+            use_tailscale: Искать пиров через Tailscale, если он доступен (False - только UDP broadcast)
         """
         self.username = username
         self.broadcast_port = broadcast_port or config.BROADCAST_PORT
         self.tcp_port = tcp_port or config.TCP_PORT
-        self.peers = {}  # {ip: {"username": str, "last_seen": float}}
+        self.peers: dict[str, PeerInfo] = {}
+        self.lock = threading.Lock()  # Защищает self.peers от потоков обнаружения и очистки
+        # Неизменяемый снимок self.peers для читателей: пересобирается под self.lock при каждом
+        # изменении, а читается без блокировки (замена ссылки атомарна)
+        self.peers_snapshot: Mapping[str, PeerInfo] = MappingProxyType({})
         self.running = False
+        self.stop_event = threading.Event()  # Будит циклы обнаружения при остановке
+        self.new_peer_callback = None  # Функция, вызываемая при обнаружении нового пира
         self.local_ip = self.get_local_ip()
-        self.use_tailscale = self._check_tailscale_available()
+        self.tailscale_api: TailscaleLocalAPI | None = None  # Задается, если доступен локальный API
+        self.use_tailscale = use_tailscale and self._check_tailscale_available()
 
         mode = "Tailscale" if self.use_tailscale else "UDP broadcast"
         logger.success(f'PeerDiscovery инициализирован для {username} на {self.local_ip} (режим: {mode})')
 
+    def set_new_peer_callback(self, callback: Callable[[str, PeerInfo], None]) -> None:
+        """
+        Установить callback для обработки новых обнаруженных пиров.
+
+        Args:
+            callback: Функция, принимающая (peer_ip, peer_info)
+        """
+        self.new_peer_callback = callback
+
+    def _notify_new_peer(self, peer_ip: str, peer_info: PeerInfo) -> None:
+        """
+        Сообщить подписчику о новом пире.
+
+        Args:
+            peer_ip: IP адрес пира
+            peer_info: Информация о пире
+        """
+        if self.new_peer_callback:
+            try:
+                self.new_peer_callback(peer_ip, peer_info)
+            except Exception as e:
+                logger.error(f'Ошибка в обработчике нового пира {peer_ip}: {e}')
+
+    @classmethod
+    def _is_tailscale_ip(cls, ip: str) -> bool:
+        """
+        Проверить, что адрес - IPv4 из диапазона Tailscale (100.64.0.0/10).
+
+        Args:
+            ip: IP адрес в текстовом виде (IPv6 адреса отбрасываются)
+
+        Returns:
+            True если адрес принадлежит Tailscale
+        """
+        try:
+            (ip_int,) = struct.unpack('!I', socket.inet_aton(ip))
+        except OSError:
+            return False
+        return ip_int & cls.TAILSCALE_MASK == cls.TAILSCALE_NET
+
     def get_local_ip(self) -> str:
         """Получить локальный IP адрес (предпочтительно Tailscale)."""
         try:
@@ -47,7 +212,7 @@ class PeerDiscovery:
                     addrs = netifaces.ifaddresses(iface)
                     if netifaces.AF_INET in addrs:
                         ip = addrs[netifaces.AF_INET][0]['addr']
-                        if ip.startswith('100.'):  # Tailscale диапазон 100.64.0.0/10
+                        if self._is_tailscale_ip(ip):
                             logger.info(f'Используется Tailscale IP: {ip}')
                             return ip
 
@@ -62,7 +227,23 @@ class PeerDiscovery:
             return '127.0.0.1'
 
     def _check_tailscale_available(self) -> bool:
-        """Проверить доступен ли Tailscale."""
+        """
+        Проверить доступен ли Tailscale.
+
+        Сначала спрашиваем локальный API. CLI проверяется, если сокета нет (например, Tailscale
+        из App Store на macOS) или запрос к API не прошел (нет прав, tailscaled перезапускается).
+        """
+        api = TailscaleLocalAPI()
+        if api.available():
+            try:
+                api.status()
+                self.tailscale_api = api
+                logger.info('Tailscale обнаружен и активен (локальный API)')
+                return True
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                api.close()
+                logger.debug(f'Локальный API Tailscale недоступен, пробую CLI: {e}')
+
         try:
             result = subprocess.run(
                 ['tailscale', 'status'],
@@ -78,21 +259,39 @@ class PeerDiscovery:
 
         return False
 
-    def _get_tailscale_peers(self) -> dict[str, dict]:
+    def _tailscale_status(self) -> dict | None:
+        """
+        Получить статус Tailscale через локальный API или, если он недоступен, через CLI.
+
+        Returns:
+            JSON статуса или None при ошибке
+        """
+        if self.tailscale_api is not None:
+            try:
+                return self.tailscale_api.status()
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                logger.warning(f'Ошибка локального API Tailscale, использую CLI: {e}')
+
+        result = subprocess.run(
+            ['tailscale', 'status', '--json'],
+            capture_output=True,
+            timeout=3,
+            text=True
+        )
+
+        if result.returncode != 0:
+            logger.warning(f'Ошибка tailscale status: {result.stderr}')
+            return None
+
+        return json.loads(result.stdout)
+
+    def _get_tailscale_peers(self) -> dict[str, PeerInfo]:
         """Получить список пиров из Tailscale."""
         try:
-            result = subprocess.run(
-                ['tailscale', 'status', '--json'],
-                capture_output=True,
-                timeout=3,
-                text=True
-            )
-
-            if result.returncode != 0:
-                logger.warning(f'Ошибка tailscale status: {result.stderr}')
+            data = self._tailscale_status()
+            if data is None:
                 return {}
 
-            data = json.loads(result.stdout)
             peers = {}
 
             # Парсим пиров
@@ -106,12 +305,8 @@ class PeerDiscovery:
                 if not tailscale_ips:
                     continue
 
-                # Берем только IPv4 (начинается с 100.)
-                peer_ip = None
-                for ip in tailscale_ips:
-                    if ip.startswith('100.'):
-                        peer_ip = ip
-                        break
+                # Берем только IPv4 из диапазона Tailscale
+                peer_ip = next((ip for ip in tailscale_ips if self._is_tailscale_ip(ip)), None)
 
                 if not peer_ip or peer_ip == self.local_ip:
                     continue
@@ -119,21 +314,22 @@ class PeerDiscovery:
                 # Используем HostName как username
                 hostname = peer_info.get('HostName', 'Unknown')
 
-                peers[peer_ip] = {
-                    'username': hostname,
-                    'tcp_port': self.tcp_port,  # Используем стандартный порт
-                    'last_seen': time.time(),
-                }
+                peers[peer_ip] = PeerInfo(
+                    username=hostname,
+                    tcp_port=self.tcp_port,  # Используем стандартный порт
+                    last_seen=time.monotonic(),
+                )
 
             return peers
 
-        except (subprocess.TimeoutExpired, json.JSONDecodeError, subprocess.SubprocessError) as e:
+        except (OSError, json.JSONDecodeError, subprocess.SubprocessError) as e:
             logger.error(f'Ошибка при получении Tailscale пиров: {e}')
             return {}
 
     def start(self) -> None:
         """Запустить процесс обнаружения пиров."""
         self.running = True
+        self.stop_event.clear()
 
         if self.use_tailscale:
             # Используем Tailscale discovery
@@ -148,70 +344,151 @@ class PeerDiscovery:
             listen_thread = threading.Thread(target=self._listen_loop, daemon=True)
             listen_thread.start()
 
-            logger.success('PeerDiscovery запущен (UDP broadcast режим)')
+            # Запасной вариант для сетей, где broadcast не доходит (IGMP snooping и т.п.)
+            scan_thread = threading.Thread(target=self._unicast_scan_loop, daemon=True)
+            scan_thread.start()
+
+            # В режиме Tailscale пиров удаляет сам цикл опроса, поэтому очистка по last_seen нужна
+            # только здесь (иначе увеличенный интервал опроса выглядел бы как пропажа пиров)
+            cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
+            cleanup_thread.start()
 
-        cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
-        cleanup_thread.start()
+            logger.success('PeerDiscovery запущен (UDP broadcast режим)')
 
     def stop(self) -> None:
         """Остановить процесс обнаружения."""
         self.running = False
+        self.stop_event.set()
         logger.info('PeerDiscovery остановлен')
 
     def _tailscale_discovery_loop(self) -> None:
-        """Периодически получать список пиров из Tailscale."""
+        """
+        Периодически получать список пиров из Tailscale.
+
+        Пока состав пиров не меняется, интервал опроса растет в 1.5 раза до DISCOVERY_INTERVAL_MAX
+        и сбрасывается до BROADCAST_INTERVAL при любом изменении.
+        """
+        base_interval = config.BROADCAST_INTERVAL
+        max_interval = config.DISCOVERY_INTERVAL_MAX
+        interval = base_interval
+        previous_ips: set[str] | None = None
+
         while self.running:
             try:
                 tailscale_peers = self._get_tailscale_peers()
 
-                # Обновляем список пиров
-                for peer_ip, peer_info in tailscale_peers.items():
-                    if peer_ip not in self.peers:
-                        logger.success(f'Обнаружен новый Tailscale пир: {peer_info["username"]} ({peer_ip})')
-
-                    self.peers[peer_ip] = peer_info
-
-                # Удаляем пиров которые больше не в Tailscale сети
-                current_peers = set(self.peers.keys())
-                tailscale_peer_ips = set(tailscale_peers.keys())
-                removed_peers = current_peers - tailscale_peer_ips
-
-                for peer_ip in removed_peers:
-                    username = self.peers[peer_ip]['username']
-                    del self.peers[peer_ip]
+                current_ips = set(tailscale_peers)
+                if current_ips == previous_ips:
+                    interval = min(interval * 1.5, max_interval)
+                else:
+                    interval = base_interval
+                previous_ips = current_ips
+
+                added = []
+                with self.lock:
+                    changed = False
+
+                    # Обновляем список пиров
+                    for peer_ip, peer_info in tailscale_peers.items():
+                        current = self.peers.get(peer_ip)
+                        if current is None:
+                            added.append((peer_ip, peer_info))
+                        elif (current.username, current.tcp_port) == (peer_info.username, peer_info.tcp_port):
+                            # Запись не изменилась: обновляем время на месте, снимок пересобирать не нужно
+                            current.last_seen = peer_info.last_seen
+                            continue
+                        self.peers[peer_ip] = peer_info
+                        changed = True
+
+                    # Удаляем пиров которые больше не в Tailscale сети
+                    removed_peers = self.peers.keys() - current_ips
+                    removed = [(peer_ip, self.peers.pop(peer_ip).username) for peer_ip in removed_peers]
+
+                    # В установившемся режиме снимок не пересобирается
+                    if changed or removed:
+                        self._publish_peers()
+
+                for peer_ip, peer_info in added:
+                    logger.success(f'Обнаружен новый Tailscale пир: {peer_info.username} ({peer_ip})')
+                    self._notify_new_peer(peer_ip, peer_info)
+
+                for peer_ip, username in removed:
                     logger.warning(f'Tailscale пир отключился: {username} ({peer_ip})')
 
             except Exception as e:
                 logger.error(f'Ошибка в Tailscale discovery loop: {e}')
 
-            time.sleep(config.BROADCAST_INTERVAL)
+            if self.stop_event.wait(interval):
+                break
 
-    def _announce_loop(self) -> None:
-        """Периодически отправлять broadcast с информацией о себе (только для локальной сети)."""
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        # Соединение с API используется только этим потоком, поэтому и закрывается здесь
+        if self.tailscale_api is not None:
+            self.tailscale_api.close()
 
-        message = json.dumps(
+    def _announce_message(self) -> bytes:
+        """Сформировать сообщение с информацией о себе (уже закодированное для отправки)."""
+        return json.dumps(
             {
                 'username': self.username,
                 'ip': self.local_ip,
                 'tcp_port': self.tcp_port,
             },
-        )
+        ).encode()
+
+    def _announce_loop(self) -> None:
+        """Периодически отправлять broadcast с информацией о себе (только для локальной сети)."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+        message = self._announce_message()
+        interval = config.BROADCAST_INTERVAL
+        targets = [(bcast_addr, self.broadcast_port) for bcast_addr in ('255.255.255.255', '192.168.255.255')]
 
         while self.running:
             try:
                 # Пробуем broadcast на разные адреса
-                for bcast_addr in ['255.255.255.255', '192.168.255.255']:
+                for target in targets:
                     try:
-                        sock.sendto(message.encode(), (bcast_addr, self.broadcast_port))
-                        logger.debug(f'Отправлен broadcast на {bcast_addr}: {self.username}')
+                        sock.sendto(message, target)
+                        # Без f-строки: loguru форматирует сообщение, только если DEBUG включен
+                        logger.debug('Отправлен broadcast на {}: {}', target[0], self.username)
                     except Exception as e:
-                        logger.debug(f'Ошибка broadcast на {bcast_addr}: {e}')
+                        logger.debug('Ошибка broadcast на {}: {}', target[0], e)
             except Exception as e:
                 logger.error(f'Ошибка при отправке broadcast: {e}')
 
-            time.sleep(config.BROADCAST_INTERVAL)
+            if self.stop_event.wait(interval):
+                break
+
+        sock.close()
+
+    def _unicast_scan_loop(self) -> None:
+        """
+        Пока пиры не найдены, рассылать о себе unicast сообщения по всей /24 подсети.
+
+        Ответ не нужен: пир, получивший сообщение, добавит нас и подключится сам.
+        """
+        if self.local_ip == '127.0.0.1':
+            return
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        message = self._announce_message()
+        subnet = self.local_ip.rsplit('.', 1)[0]
+        port = self.broadcast_port
+        targets = [(ip, port) for ip in (f'{subnet}.{host}' for host in range(1, 255)) if ip != self.local_ip]
+        interval = config.UNICAST_SCAN_INTERVAL
+
+        while self.running:
+            if not self.peers:
+                logger.debug('Unicast сканирование {}.0/24', subnet)
+                for target in targets:
+                    try:
+                        sock.sendto(message, target)
+                    except OSError:
+                        continue
+
+            if self.stop_event.wait(interval):
+                break
 
         sock.close()
 
@@ -224,23 +501,50 @@ class PeerDiscovery:
 
         logger.debug(f'Прослушивание broadcast на порту {self.broadcast_port}')
 
+        max_size = self.ANNOUNCE_MAX_SIZE
+        min_gap = self.ANNOUNCE_MIN_GAP
+        sources_max = self.ANNOUNCE_SOURCES_MAX
+        last_accepted: dict[str, float] = {}  # {ip отправителя: time.monotonic() последнего анонса}
+
         while self.running:
             try:
                 data, addr = sock.recvfrom(1024)
-                peer_info = json.loads(data.decode())
+
+                # Дешевые проверки до json.loads: не JSON объект или слишком большой пакет
+                if len(data) > max_size or data[:1] != b'{' or data[-1:] != b'}':
+                    continue
+
+                # Анонс приходит на несколько broadcast адресов сразу, а чаще раза в
+                # ANNOUNCE_MIN_GAP его не шлет ни один честный пир
+                now = time.monotonic()
+                source = addr[0]
+                if now - last_accepted.get(source, -min_gap) < min_gap:
+                    continue
+                if len(last_accepted) >= sources_max:
+                    last_accepted.clear()
+                last_accepted[source] = now
+
+                # json.loads разбирает UTF-8 bytes сам, без промежуточной строки
+                peer_info = json.loads(data)
                 peer_ip = peer_info['ip']
 
                 if peer_ip == self.local_ip:
                     continue
 
-                if peer_ip not in self.peers:
-                    logger.success(f'Обнаружен новый пир: {peer_info["username"]} ({peer_ip})')
+                info = PeerInfo(
+                    username=peer_info['username'],
+                    tcp_port=peer_info['tcp_port'],
+                    last_seen=now,
+                )
+
+                with self.lock:
+                    is_new = peer_ip not in self.peers
+                    self.peers[peer_ip] = info
+                    self._publish_peers()
 
-                self.peers[peer_ip] = {
-                    'username': peer_info['username'],
-                    'tcp_port': peer_info['tcp_port'],
-                    'last_seen': time.time(),
-                }
+                if is_new:
+                    logger.success(f'Обнаружен новый пир: {info.username} ({peer_ip})')
+                    self._notify_new_peer(peer_ip, info)
 
             except TimeoutError:
                 continue
@@ -250,22 +554,81 @@ class PeerDiscovery:
         sock.close()
 
     def _cleanup_loop(self) -> None:
-        """Удалять пиров, которые давно не отвечали."""
-        while self.running:
-            current_time = time.time()
-            to_remove = []
+        """
+        Удалять пиров, которые давно не отвечали.
 
-            for peer_ip, info in self.peers.items():
-                if current_time - info['last_seen'] > config.PEER_TIMEOUT:
-                    to_remove.append(peer_ip)
+        Поток спит до момента, когда может истечь самый старый пир (но не меньше CLEANUP_INTERVAL),
+        а не просыпается каждые CLEANUP_INTERVAL впустую.
+        """
+        # Config неизменяем, поэтому значения достаточно прочитать один раз
+        peer_timeout = config.PEER_TIMEOUT
+        min_interval = config.CLEANUP_INTERVAL
 
-            for peer_ip in to_remove:
-                username = self.peers[peer_ip]['username']
-                del self.peers[peer_ip]
+        while self.running:
+            current_time = time.monotonic()
+            expired_before = current_time - peer_timeout
+
+            # Просматриваем снимок без блокировки, блокировка нужна только чтобы удалить
+            peers = self.peers_snapshot
+            to_remove = [peer_ip for peer_ip, info in peers.items() if info.last_seen < expired_before]
+
+            removed = []
+            if to_remove:
+                with self.lock:
+                    # Пир мог успеть снова отозваться, пока мы смотрели снимок
+                    removed = [
+                        (peer_ip, self.peers.pop(peer_ip).username)
+                        for peer_ip in to_remove
+                        if peer_ip in self.peers and self.peers[peer_ip].last_seen < expired_before
+                    ]
+                    if removed:
+                        self._publish_peers()
+                    peers = self.peers_snapshot
+
+            # Новый пир истечет не раньше чем через PEER_TIMEOUT
+            oldest_seen = min((info.last_seen for info in peers.values()), default=current_time)
+
+            for peer_ip, username in removed:
                 logger.warning(f'Пир отключился: {username} ({peer_ip})')
 
-            time.sleep(config.CLEANUP_INTERVAL)
+            wait = max(oldest_seen + peer_timeout - current_time, min_interval)
+            if self.stop_event.wait(wait):
+                break
+
+    def _publish_peers(self) -> None:
+        """Пересобрать снимок пиров (вызывать под self.lock после изменения self.peers)."""
+        self.peers_snapshot = MappingProxyType(dict(self.peers))
+
+    def get_peers(self) -> Mapping[str, PeerInfo]:
+        """Получить список активных пиров (неизменяемый снимок, без копирования и блокировки)."""
+        return self.peers_snapshot
+
+    def username_for(self, peer_ip: str) -> str:
+        """
+        Получить имя пира без копирования всего списка пиров.
+
+        Args:
+            peer_ip: IP адрес пира
+
+        Returns:
+            Имя пользователя или сам IP, если пир неизвестен
+        """
+        info = self.peers_snapshot.get(peer_ip)
+        return info.username if info else peer_ip
+
+    def iter_new_peers(self, connected: set[str] | list[str]) -> Iterator[tuple[str, PeerInfo]]:
+        """
+        Перебрать обнаруженных пиров, с которыми еще нет соединения.
+
+        Обход идет по снимку без блокировки, поэтому вызывающий код может подключаться
+        к пирам прямо в цикле.
+
+        Args:
+            connected: IP адреса уже подключенных пиров
 
-    def get_peers(self) -> dict[str, dict[str, str | int | float]]:
-        """Получить список активных пиров."""
-        return dict(self.peers)
+        Yields:
+            Пары (peer_ip, peer_info)
+        """
+        for peer_ip, info in self.peers_snapshot.items():
+            if peer_ip not in connected:
+                yield peer_ip, info
@@ -2,7 +2,7 @@ import sys
 
 from loguru import logger
 
-from config import config
+from src.config import config
 
 
 def setup_logging() -> None:
@@ -1,3 +1,4 @@
+import argparse
 import curses
 import threading
 import time
@@ -7,20 +8,12 @@ from loguru import logger
 from src.app import VoiceP2PChat
 from src.cli import app
 from src.config import config
+from src.log import setup_logging
 
-# setup_logging()
 
-
-def main() -> None:
-    """Точка входа в приложение."""
-
-    curses.wrapper(app)
-
-    return
-
-    # username = config.USERNAME
-    # if not username:
-    #     username = prompt_username()
+def run_console() -> None:
+    """Запустить чат без curses: статус и выход через команды в консоли."""
+    setup_logging()
 
     chat = VoiceP2PChat(config.USERNAME)
 
@@ -37,16 +30,25 @@ def main() -> None:
                 chat.print_status()
             elif cmd == 'quit':
                 break
-            elif cmd:
-                pass
 
     except KeyboardInterrupt:
         pass
     finally:
         chat.stop()
-        time.sleep(1)
         logger.info('Программа завершена')
 
 
+def main() -> None:
+    """Точка входа в приложение."""
+    parser = argparse.ArgumentParser(prog='roar')
+    parser.add_argument('--console', action='store_true', help='запустить без curses интерфейса')
+    args = parser.parse_args()
+
+    if args.console:
+        run_console()
+    else:
+        curses.wrapper(app)
+
+
 if __name__ == '__main__':
     main()
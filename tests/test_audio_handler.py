@@ -0,0 +1,158 @@
+import io
+import unittest
+
+import numpy as np
+import soundfile as sf
+
+from src.core.audio_handler import JitterEstimator, PacketMixer, SPSCRing, SPSCRingBuffer
+
+
+class SPSCRingBufferTest(unittest.TestCase):
+    """Кольцевой байтовый буфер."""
+
+    def test_write_rejects_when_full(self) -> None:
+        ring = SPSCRingBuffer(8)
+        self.assertTrue(ring.write(b'abcdef'))
+        self.assertFalse(ring.write(b'xyz'))
+        self.assertEqual(len(ring), 6)
+
+    def test_wraparound(self) -> None:
+        ring = SPSCRingBuffer(8)
+        ring.write(b'abcdef')
+        ring.advance(4)
+
+        # 'ghijk' переходит через границу буфера
+        self.assertTrue(ring.write(b'ghijk'))
+        self.assertEqual(len(ring), 7)
+        self.assertEqual(bytes(ring.peek(7)), b'efghijk')
+        self.assertIsNone(ring.peek(8))
+
+        ring.advance(7)
+        self.assertEqual(len(ring), 0)
+
+
+class SPSCRingTest(unittest.TestCase):
+    """Кольцевая очередь объектов."""
+
+    def test_put_rejects_when_full(self) -> None:
+        ring = SPSCRing(2)
+        self.assertTrue(ring.put(1))
+        self.assertTrue(ring.put(2))
+        self.assertFalse(ring.put(3))
+        self.assertEqual(len(ring), 2)
+
+    def test_get_in_order_across_wraparound(self) -> None:
+        ring = SPSCRing(3)
+        result = []
+        for item in range(10):
+            ring.put(item)
+            if len(ring) == 2:
+                result.append(ring.get())
+        while len(ring):
+            result.append(ring.get())
+
+        self.assertEqual(result, list(range(10)))
+        self.assertIsNone(ring.get())
+
+    def test_drop_returns_oldest(self) -> None:
+        ring = SPSCRing(4)
+        for item in 'abcd':
+            ring.put(item)
+        ring.get()
+        ring.put('e')
+
+        self.assertEqual(ring.drop(2), ['b', 'c'])
+        self.assertEqual(ring.peek(), 'd')
+        self.assertEqual(ring.drop(10), ['d', 'e'])
+        self.assertEqual(len(ring), 0)
+
+
+class JitterEstimatorTest(unittest.TestCase):
+    """Оценка глубины буфера пира по джиттеру."""
+
+    INTERVAL = 0.02
+
+    def test_steady_arrivals_keep_minimum(self) -> None:
+        estimator = JitterEstimator(self.INTERVAL, 2, 8)
+        for i in range(100):
+            estimator.update(i * self.INTERVAL)
+        self.assertEqual(estimator.target, 2)
+
+    def test_target_grows_with_jitter(self) -> None:
+        estimator = JitterEstimator(self.INTERVAL, 2, 8)
+        now = 0.0
+        for i in range(200):
+            # Пакеты приходят парами: почти одновременно, затем пауза в 3 чанка
+            now += 3 * self.INTERVAL if i % 2 else 0.0
+            estimator.update(now)
+        self.assertGreater(estimator.target, 2)
+        self.assertLessEqual(estimator.target, 8)
+
+    def test_target_clamped_to_maximum(self) -> None:
+        estimator = JitterEstimator(self.INTERVAL, 2, 3)
+        now = 0.0
+        for i in range(200):
+            now += 3.9 * self.INTERVAL if i % 2 else 0.0
+            estimator.update(now)
+        self.assertEqual(estimator.target, 3)
+
+    def test_spurt_gap_is_not_jitter(self) -> None:
+        estimator = JitterEstimator(self.INTERVAL, 2, 8)
+        estimator.update(0.0)
+        estimator.update(10.0)
+        self.assertEqual(estimator.jitter, 0.0)
+        self.assertEqual(estimator.target, 2)
+
+
+class PacketMixerTest(unittest.TestCase):
+    """Декодирование и суммирование пакетов."""
+
+    def test_pcm_sum_is_clipped(self) -> None:
+        mixer = PacketMixer(4)
+        a = np.array([30000, -30000, 100, 0], dtype=np.int16)
+        b = np.array([30000, -30000, 200, 5], dtype=np.int16)
+
+        out = mixer.mix([(a.tobytes(), False), (b.tobytes(), False)])
+        self.assertEqual(out.tolist(), [32767, -32768, 300, 5])
+
+    def test_mixes_to_shortest_packet(self) -> None:
+        mixer = PacketMixer(4)
+        a = np.array([1, 2, 3, 4], dtype=np.int16)
+        b = np.array([10, 20], dtype=np.int16)
+
+        out = mixer.mix([(a.tobytes(), False), (b.tobytes(), False)])
+        self.assertEqual(out.tolist(), [11, 22])
+
+    def test_nothing_to_mix(self) -> None:
+        mixer = PacketMixer(4)
+        self.assertIsNone(mixer.mix([]))
+        self.assertIsNone(mixer.mix([(b'not ogg', True)]))
+
+    def test_vorbis_round_trip(self) -> None:
+        rate = 16000
+        samples = 2048
+        signal = (0.5 * np.sin(2 * np.pi * 440 * np.arange(samples) / rate) * 32767).astype(np.int16)
+
+        buffer = io.BytesIO()
+        sf.write(buffer, signal, rate, format='OGG')
+
+        out = PacketMixer(samples).mix([(buffer.getvalue(), True)])
+        self.assertEqual(len(out), samples)
+        self.assertGreater(np.corrcoef(signal, out)[0, 1], 0.99)
+
+    def test_long_packets_are_not_truncated(self) -> None:
+        # Нота мелодии (0.2 с при 16 kHz) длиннее чанка, под который создан микшер
+        rate = 16000
+        samples = 3200
+        signal = (0.5 * np.sin(2 * np.pi * 440 * np.arange(samples) / rate) * 32767).astype(np.int16)
+
+        buffer = io.BytesIO()
+        sf.write(buffer, signal, rate, format='OGG')
+
+        mixer = PacketMixer(2048)
+        self.assertEqual(len(mixer.mix([(buffer.getvalue(), True)])), samples)
+        self.assertEqual(mixer.mix([(signal.tobytes(), False)]).tolist(), signal.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import unittest
+from unittest import mock
+
+from src.config import Config, _load, _parse_bool
+
+
+class ParseBoolTest(unittest.TestCase):
+    """Разбор логических значений из окружения."""
+
+    def test_true_values(self) -> None:
+        for raw in ('1', 'true', 'True', 'YES', 'on', ' on '):
+            with self.subTest(raw=raw):
+                self.assertIs(_parse_bool(raw), True)
+
+    def test_false_values(self) -> None:
+        for raw in ('0', 'false', 'FALSE', 'no', 'off'):
+            with self.subTest(raw=raw):
+                self.assertIs(_parse_bool(raw), False)
+
+    def test_invalid_values(self) -> None:
+        for raw in ('', '2', 'nope', 'да'):
+            with self.subTest(raw=raw), self.assertRaises(ValueError):
+                _parse_bool(raw)
+
+
+class ConfigTest(unittest.TestCase):
+    """Проверка и загрузка конфигурации."""
+
+    def test_port_range(self) -> None:
+        Config(TCP_PORT=1, BROADCAST_PORT=65535)
+        for name, port in (('TCP_PORT', 0), ('TCP_PORT', 65536), ('BROADCAST_PORT', -1)):
+            with self.subTest(name=name, port=port), self.assertRaises(ValueError):
+                Config(**{name: port})
+
+    def test_load_from_environment(self) -> None:
+        with mock.patch.dict(os.environ, {'TCP_PORT': '6000', 'AUDIO_COMPRESSION': 'off'}):
+            config = _load()
+        self.assertEqual(config.TCP_PORT, 6000)
+        self.assertIs(config.AUDIO_COMPRESSION, False)
+
+    def test_load_rejects_bad_values(self) -> None:
+        for name, raw in (('TCP_PORT', 'abc'), ('AUDIO_COMPRESSION', 'maybe'), ('TCP_PORT', '70000')):
+            with self.subTest(name=name), mock.patch.dict(os.environ, {name: raw}):
+                with self.assertRaises(ValueError):
+                    _load()
+
+
+if __name__ == '__main__':
+    unittest.main()
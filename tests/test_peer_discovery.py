@@ -0,0 +1,26 @@
+import unittest
+
+from src.core.peer_discovery import PeerDiscovery
+
+
+class TailscaleIpTest(unittest.TestCase):
+    """Проверка адресов Tailscale (100.64.0.0/10)."""
+
+    def test_inside_range(self) -> None:
+        for ip in ('100.64.0.0', '100.64.0.1', '100.100.100.100', '100.127.255.255'):
+            with self.subTest(ip=ip):
+                self.assertTrue(PeerDiscovery._is_tailscale_ip(ip))
+
+    def test_outside_range(self) -> None:
+        for ip in ('100.63.255.255', '100.128.0.0', '100.1.2.3', '10.0.0.1', '192.168.1.1'):
+            with self.subTest(ip=ip):
+                self.assertFalse(PeerDiscovery._is_tailscale_ip(ip))
+
+    def test_not_ipv4(self) -> None:
+        for ip in ('fd7a:115c:a1e0::1', 'localhost', ''):
+            with self.subTest(ip=ip):
+                self.assertFalse(PeerDiscovery._is_tailscale_ip(ip))
+
+
+if __name__ == '__main__':
+    unittest.main()